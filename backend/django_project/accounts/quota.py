@@ -0,0 +1,26 @@
+"""Atomic accounting of per-user search quotas."""
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import UserSearchQuota
+
+
+def consume_search(user) -> bool:
+    """Take one search from ``user``'s quota; ``False`` if none is left.
+
+    A single conditional ``UPDATE`` both checks and decrements the
+    counter, so concurrent searches can never overspend it or lose each
+    other's decrements. Users without a quota row have no searches.
+    """
+    updated = UserSearchQuota.objects.filter(
+        user=user, remaining__gt=0
+    ).update(remaining=F("remaining") - 1, updated_at=timezone.now())
+    return updated == 1
+
+
+def refund_search(user) -> None:
+    """Give back a search consumed by a request that then failed."""
+    UserSearchQuota.objects.filter(user=user).update(
+        remaining=F("remaining") + 1, updated_at=timezone.now()
+    )
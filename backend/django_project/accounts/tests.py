@@ -5,7 +5,13 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from datetime import datetime, timezone, timedelta
 from .forms import PlatformUserForm
-from .models import PlatformUser, PasswordPolicy, PasswordResetToken
+from .models import (
+    PlatformUser,
+    PasswordPolicy,
+    PasswordResetToken,
+    UserSearchQuota,
+)
+from .quota import consume_search, refund_search
 
 
 @pytest.mark.django_db
@@ -304,3 +310,20 @@ def test_change_password_wrong_current():
     assert resp.status_code == 400
     user.refresh_from_db()
     assert user.check_password("pass123")
+
+
+@pytest.mark.django_db
+def test_search_quota_is_consumed_atomically_and_refunded():
+    user = PlatformUser.objects.create_user(
+        username="q", email="q@x.com", password="pass"
+    )
+    assert consume_search(user) is False
+
+    UserSearchQuota.objects.create(user=user, remaining=2)
+    assert consume_search(user) is True
+    assert consume_search(user) is True
+    assert consume_search(user) is False
+    assert UserSearchQuota.objects.get(user=user).remaining == 0
+
+    refund_search(user)
+    assert UserSearchQuota.objects.get(user=user).remaining == 1
@@ -1,12 +1,19 @@
 """Celery application configuration and task definitions."""
 
 import os
+from datetime import timedelta
 
 import django
 from celery import Celery, states
 from celery.schedules import crontab
 from celery.exceptions import Ignore
+from celery.signals import (
+    worker_process_init,
+    worker_process_shutdown,
+    worker_ready,
+)
 from django.conf import settings
+from django.utils import timezone
 import structlog
 
 from core.logging_conf import configure_logging
@@ -16,6 +23,12 @@ django.setup()
 
 from scrapers.service import run_scraper_for_site  # noqa: E402
 from scrapers import load_custom_scrapers  # noqa: E402
+from scrapers.browser_pool import close_browser_pool  # noqa: E402
+from leaks.mongo_utils import close_mongo_client  # noqa: E402
+from leaks.mongo_utils import reset_mongo_client  # noqa: E402
+from leaks.indexes import ensure_indexes  # noqa: E402
+from leaks.pipeline import consume_leaks, relay_outbox  # noqa: E402
+from leaks.rollups import rebuild_rollups  # noqa: E402
 from sites.models import Site  # noqa: E402
 
 configure_logging()
@@ -27,6 +40,17 @@ def refresh_site_schedules(celery_app: Celery) -> None:
     from celery.schedules import crontab
 
     celery_app.conf.beat_schedule = {}
+    if settings.LEAK_PIPELINE_BACKEND == "redis":
+        celery_app.add_periodic_task(
+            settings.LEAK_PIPELINE_INTERVAL,
+            process_leak_pipeline.s(),
+            name="process_leak_pipeline",
+        )
+    celery_app.add_periodic_task(
+        crontab(minute=15, hour=0),
+        rebuild_leak_rollups.s(),
+        name="rebuild_leak_rollups",
+    )
     for site in Site.objects.filter(enabled=True):
         schedule = crontab(minute=f"*/{site.frequency_minutes}")
         celery_app.add_periodic_task(
@@ -59,6 +83,42 @@ def setup_periodic_tasks(sender, **kwargs):
     )
 
 
+@worker_ready.connect
+def ensure_mongo_indexes(**kwargs) -> None:
+    """Create missing Mongo indexes once the worker has started."""
+    try:
+        report = ensure_indexes()
+    except Exception as exc:
+        logger.exception(
+            "Falha ao garantir índices do MongoDB", error=str(exc)
+        )
+        return
+    if report.created:
+        logger.info("Índices do MongoDB criados", indexes=report.created)
+    if report.blocked:
+        logger.error(
+            "Índices do MongoDB bloqueados por leaks duplicados",
+            indexes=report.blocked,
+        )
+
+
+@worker_process_init.connect
+def reset_mongo_after_fork(**kwargs) -> None:
+    """Drop the Mongo client inherited from the prefork parent."""
+    reset_mongo_client()
+
+
+@worker_process_shutdown.connect
+def shutdown_browser_pool(**kwargs) -> None:
+    """Close warm headless browsers when a worker process exits."""
+    close_browser_pool()
+
+
+@worker_process_shutdown.connect
+def shutdown_mongo_client(**kwargs) -> None:
+    close_mongo_client()
+
+
 def _fail(task, msg: str, exc_cls: str = "ValueError"):
     logger.error("Celery Failure", task_id=task.request.id, message=msg)
     task.update_state(
@@ -91,6 +151,22 @@ def scrape_all_sites() -> int:
     return total
 
 
+@app.task(name="process_leak_pipeline")
+def process_leak_pipeline() -> int:
+    """Run post-ingest receivers for leaks published by ingestion."""
+    relay_outbox()
+    return consume_leaks()
+
+
+@app.task(name="rebuild_leak_rollups")
+def rebuild_leak_rollups() -> int:
+    """Recount recent rollup buckets to repair missed increments."""
+    since = timezone.localdate() - timedelta(
+        days=settings.LEAK_ROLLUP_REBUILD_DAYS
+    )
+    return rebuild_rollups(since)
+
+
 @app.task(name="reload_scrapers")
 def reload_scrapers_task() -> bool:
     """Reload custom scrapers on all workers."""
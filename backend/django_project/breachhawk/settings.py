@@ -108,6 +108,17 @@ DATABASES = {
     }
 }
 
+# Optional read replica, used by the Postgres leak search backend.
+if os.environ.get("DJANGO_DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["DJANGO_DB_REPLICA_HOST"],
+        "PORT": os.environ.get(
+            "DJANGO_DB_REPLICA_PORT", DATABASES["default"]["PORT"]
+        ),
+        "TEST": {"MIRROR": "default"},
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -198,6 +209,68 @@ MONGODB_URI = os.environ.get("MONGODB_URI", "mongodb://mongo:27017")
 MONGODB_DB = os.environ.get("MONGODB_DB", "breach_db")
 MONGODB_USER = os.environ.get("MONGODB_USER", "admin")
 MONGODB_PASS = os.environ.get("MONGODB_PASS", "strongpassword")
+MONGODB_MAX_POOL_SIZE = int(os.environ.get("MONGODB_MAX_POOL_SIZE", "20"))
+MONGODB_MIN_POOL_SIZE = int(os.environ.get("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(
+    os.environ.get("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")
+)
+# Server-side limit for read queries, so a slow search cannot pile up.
+MONGODB_MAX_TIME_MS = int(os.environ.get("MONGODB_MAX_TIME_MS", "10000"))
+LEAK_INSERT_BATCH_SIZE = int(os.environ.get("LEAK_INSERT_BATCH_SIZE", "500"))
+SITE_CACHE_TTL = float(os.environ.get("SITE_CACHE_TTL", "60"))
+# Shorter search tokens are matched as a company prefix instead of $text.
+LEAK_SEARCH_MIN_TEXT_TOKEN = int(
+    os.environ.get("LEAK_SEARCH_MIN_TEXT_TOKEN", "4")
+)
+LEAK_SEARCH_CACHE_TTL = int(os.environ.get("LEAK_SEARCH_CACHE_TTL", "300"))
+# "mongo" or "postgres"; see leaks.search.SEARCH_BACKENDS.
+LEAK_SEARCH_BACKEND = os.environ.get("LEAK_SEARCH_BACKEND", "mongo")
+LEAK_SEARCH_DATABASE = "replica" if "replica" in DATABASES else "default"
+LEAK_EXPORT_CHUNK_SIZE = int(os.environ.get("LEAK_EXPORT_CHUNK_SIZE", "2000"))
+# Post-ingest pipeline (leaks.pipeline): "inline" runs alerting and
+# rollups during ingestion, "redis" defers them to a stream consumer.
+LEAK_PIPELINE_BACKEND = os.environ.get("LEAK_PIPELINE_BACKEND", "inline")
+LEAK_PIPELINE_REDIS_URL = os.environ.get(
+    "LEAK_PIPELINE_REDIS_URL", "redis://redis:6379/4"
+)
+LEAK_PIPELINE_STREAM = os.environ.get("LEAK_PIPELINE_STREAM", "leaks:created")
+LEAK_PIPELINE_GROUP = os.environ.get("LEAK_PIPELINE_GROUP", "post-ingest")
+LEAK_PIPELINE_MAXLEN = int(os.environ.get("LEAK_PIPELINE_MAXLEN", "100000"))
+LEAK_PIPELINE_CLAIM_IDLE_MS = int(
+    os.environ.get("LEAK_PIPELINE_CLAIM_IDLE_MS", "300000")
+)
+LEAK_PIPELINE_INTERVAL = float(os.environ.get("LEAK_PIPELINE_INTERVAL", "10"))
+# Entries failing this many deliveries move to the dead-letter stream.
+LEAK_PIPELINE_MAX_DELIVERIES = int(
+    os.environ.get("LEAK_PIPELINE_MAX_DELIVERIES", "5")
+)
+LEAK_PIPELINE_DEAD_LETTER_STREAM = os.environ.get(
+    "LEAK_PIPELINE_DEAD_LETTER_STREAM", "leaks:created:dead"
+)
+# Days of rollups recounted by the nightly rebuild_leak_rollups task.
+LEAK_ROLLUP_REBUILD_DAYS = int(os.environ.get("LEAK_ROLLUP_REBUILD_DAYS", "2"))
+
+# Shared cache for search results and counters. Without Redis each
+# process keeps its own in-memory cache.
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+if CACHE_REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+# Search pages are only cached in a shared cache: with per-process caches
+# ingestion in a worker could not invalidate the web processes' pages.
+LEAK_SEARCH_CACHE_ENABLED = os.environ.get(
+    "LEAK_SEARCH_CACHE_ENABLED", str(bool(CACHE_REDIS_URL))
+) == "True"
 TOR_CONTROL_HOST = os.environ.get("TOR_CONTROL_HOST", "tor")
 TOR_CONTROL_PORT = int(os.environ.get("TOR_CONTROL_PORT", "9051"))
 TOR_CONTROL_PASSWORD = os.environ.get(
@@ -205,7 +278,32 @@ TOR_CONTROL_PASSWORD = os.environ.get(
 )
 TOR_MAX_RETRIES = int(os.environ.get("TOR_MAX_RETRIES", "3"))
 TOR_RETRY_INTERVAL = float(os.environ.get("TOR_RETRY_INTERVAL", "5.0"))
+TOR_RETRY_BACKOFF_MAX = float(
+    os.environ.get("TOR_RETRY_BACKOFF_MAX", "300.0")
+)
+SCRAPER_DEFER_RETRIES = os.environ.get(
+    "SCRAPER_DEFER_RETRIES", "True"
+) == "True"
 TOR_PROXY = os.environ.get("TOR_PROXY", "socks5://tor:9050")
+TOR_STREAM_ISOLATION = os.environ.get(
+    "TOR_STREAM_ISOLATION", "True"
+) == "True"
+SCRAPER_SITE_CONCURRENCY = int(
+    os.environ.get("SCRAPER_SITE_CONCURRENCY", "4")
+)
+SCRAPER_SESSION_POOL_SIZE = int(
+    os.environ.get("SCRAPER_SESSION_POOL_SIZE", "32")
+)
+SCRAPER_SESSION_IDLE_SECONDS = float(
+    os.environ.get("SCRAPER_SESSION_IDLE_SECONDS", "300")
+)
+SCRAPER_SESSION_CONNECTIONS = int(
+    os.environ.get("SCRAPER_SESSION_CONNECTIONS", "4")
+)
+PLAYWRIGHT_POOL_SIZE = int(os.environ.get("PLAYWRIGHT_POOL_SIZE", "2"))
+PLAYWRIGHT_MAX_PAGES_PER_BROWSER = int(
+    os.environ.get("PLAYWRIGHT_MAX_PAGES_PER_BROWSER", "50")
+)
 SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.seuservidor.com")
 SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
 SMTP_USER = os.environ.get("SMTP_USER", "avisos@meudominio.com")
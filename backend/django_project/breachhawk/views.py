@@ -1,8 +1,7 @@
 
 from django.http import JsonResponse
 from django.db import connections, DatabaseError
-from pymongo import MongoClient
-from django.conf import settings
+from leaks.mongo_utils import get_mongo_client
 from django.views.decorators.csrf import csrf_exempt
 
 
@@ -18,11 +17,7 @@ def health_check(request):
 
     # Check MongoDB
     try:
-        mongo_client = MongoClient(
-          settings.MONGODB_URI,
-          serverSelectionTimeoutMS=2000
-        )
-        mongo_client.admin.command("ping")
+        get_mongo_client().admin.command("ping")
         status["mongodb"] = "ok"
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)})
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class LeaksConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "leaks"
+
+    def ready(self):
+        from . import pipeline, rollups, search_cache  # noqa: F401
+        from .lookups import TrigramIContains
+        from .models import Leak
+
+        # Only these columns have trigram indexes (migration 0005).
+        for name in ("company", "information", "comment"):
+            Leak._meta.get_field(name).register_lookup(TrigramIContains)
@@ -0,0 +1,84 @@
+"""Streaming NDJSON and CSV exports of leak rows."""
+
+import csv
+import json
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+
+EXPORT_FIELDS = (
+    "id",
+    "site_id",
+    "company",
+    "country",
+    "found_at",
+    "source_url",
+    "views",
+    "publication_date",
+    "amount_of_data",
+    "information",
+    "comment",
+    "download_links",
+    "rar_password",
+)
+
+
+def export_rows(queryset: QuerySet) -> Iterator[tuple]:
+    """Yield ``EXPORT_FIELDS`` tuples of ``queryset``, newest first.
+
+    ``iterator()`` reads through a server-side cursor on Postgres, so
+    only ``LEAK_EXPORT_CHUNK_SIZE`` rows are held in memory at a time
+    however large the export is.
+    """
+    return (
+        queryset.order_by("-found_at", "-id")
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=settings.LEAK_EXPORT_CHUNK_SIZE)
+    )
+
+
+def iter_ndjson(rows: Iterable[tuple]) -> Iterator[str]:
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + "\n"
+
+
+# Leading characters that make spreadsheet applications evaluate a cell.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_cell(value):
+    """Neutralise cells a spreadsheet would run as a formula.
+
+    Leak fields are scraped from hostile sites, so a value such as
+    ``=HYPERLINK(...)`` must reach the analyst as text.
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """File-like object handing each CSV line back to the caller."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv(rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    links = EXPORT_FIELDS.index("download_links")
+    for row in rows:
+        row = list(row)
+        if row[links] is not None:
+            row[links] = json.dumps(row[links])
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+EXPORT_FORMATS = {
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+    "csv": (iter_csv, "text/csv"),
+}
@@ -0,0 +1,66 @@
+"""Query-string filters for relational leak listings."""
+
+from datetime import datetime, time
+from typing import Mapping, Optional
+
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+# Columns matched by ``q``; each has a trigram index (migration 0005).
+TEXT_FIELDS = ("company", "information", "comment")
+
+
+def _parse_bound(value: str, end_of_day: bool = False) -> datetime:
+    """Parse an ISO date or datetime; bare dates cover the whole day."""
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is not None:
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    else:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _param(params: Mapping, name: str) -> Optional[str]:
+    value = params.get(name)
+    return value.strip() if value and value.strip() else None
+
+
+def filter_leaks(queryset: QuerySet, params: Mapping) -> QuerySet:
+    """Narrow ``queryset`` by the leak filters present in ``params``.
+
+    Supported parameters are ``site`` (id), ``country`` (exact),
+    ``found_after`` / ``found_before`` (ISO date or datetime, inclusive)
+    ``company`` (case-sensitive prefix) and ``q`` (case-insensitive
+    substring of company, information or comment). Each one is served by
+    an index on ``Leak``.
+    """
+    try:
+        if site := _param(params, "site"):
+            queryset = queryset.filter(site_id=int(site))
+        if country := _param(params, "country"):
+            queryset = queryset.filter(country=country)
+        if found_after := _param(params, "found_after"):
+            queryset = queryset.filter(found_at__gte=_parse_bound(found_after))
+        if found_before := _param(params, "found_before"):
+            queryset = queryset.filter(
+                found_at__lte=_parse_bound(found_before, end_of_day=True)
+            )
+    except ValueError as exc:
+        raise ValidationError({"detail": f"Filtro inválido: {exc}"})
+    if company := _param(params, "company"):
+        queryset = queryset.filter(company__startswith=company)
+    if text := _param(params, "q"):
+        match = Q()
+        for name in TEXT_FIELDS:
+            match |= Q(**{f"{name}__trgm_icontains": text})
+        queryset = queryset.filter(match)
+    return queryset
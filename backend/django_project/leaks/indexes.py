@@ -0,0 +1,157 @@
+"""Declared MongoDB indexes of the leaks collection and their upkeep."""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from .mongo_utils import (
+    COMPANY_COLLATION,
+    DUPLICATE_KEY_ERROR,
+    leaks_collection,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _index(keys, **options) -> IndexModel:
+    # Servers before 4.2 would otherwise lock the collection while
+    # building; newer ones ignore the flag.
+    return IndexModel(keys, background=True, **options)
+
+
+# Each index names the query it serves; keep this list in sync with the
+# read and write paths of ``mongo_utils``.
+LEAK_INDEXES = [
+    # find_leaks_by_site: site filter with the (found_at, _id) keyset.
+    _index(
+        [
+            ("site_id", ASCENDING),
+            ("found_at", DESCENDING),
+            ("_id", DESCENDING),
+        ],
+        name="site_found_at_idx",
+    ),
+    # Newest-first listings across all sites.
+    _index(
+        [("found_at", DESCENDING), ("_id", DESCENDING)], name="found_at_idx"
+    ),
+    # Upsert key of insert_leak(s).
+    _index(
+        [("company", ASCENDING), ("source_url", ASCENDING)],
+        name="company_source_url_uniq",
+        unique=True,
+    ),
+    # search_leaks short-token fallback: case-insensitive company prefix
+    # range in (company, _id) order. Only queries that pass the same
+    # collation can use it.
+    _index(
+        [("company", ASCENDING), ("_id", ASCENDING)],
+        name="company_prefix_idx",
+        collation=COMPANY_COLLATION,
+    ),
+    # search_leaks $text queries.
+    _index(
+        [("company", TEXT), ("information", TEXT), ("comment", TEXT)],
+        name="text_search",
+    ),
+]
+
+
+@dataclass
+class IndexReport:
+    created: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    conflicting: List[str] = field(default_factory=list)
+    undeclared: List[str] = field(default_factory=list)
+    unused: List[str] = field(default_factory=list)
+    # Unique indexes that existing duplicate documents keep from building.
+    blocked: List[str] = field(default_factory=list)
+
+
+def _declared() -> Dict[str, IndexModel]:
+    return {index.document["name"]: index for index in LEAK_INDEXES}
+
+
+def _same_index(declared: dict, existing: dict) -> bool:
+    if "weights" in existing:
+        # Text indexes are stored as _fts/_ftsx keys plus field weights.
+        return set(existing["weights"]) == set(declared["key"])
+    # The server fills in every collation option; compare the declared ones.
+    collation = existing.get("collation", {})
+    if any(
+        collation.get(option) != value
+        for option, value in declared.get("collation", {}).items()
+    ):
+        return False
+    return list(existing["key"]) == list(declared["key"].items())
+
+
+def index_usage() -> Dict[str, int]:
+    """Return the operations served by each index since server start."""
+    return {
+        stat["name"]: stat["accesses"]["ops"]
+        for stat in leaks_collection().aggregate([{"$indexStats": {}}])
+    }
+
+
+def check_indexes() -> IndexReport:
+    """Compare the declared indexes with the ones on the collection."""
+    report = IndexReport()
+    existing = leaks_collection().index_information()
+    declared = _declared()
+    matched = set()
+    for name, index in declared.items():
+        found = [
+            other
+            for other, info in existing.items()
+            if _same_index(index.document, info)
+        ]
+        if found:
+            matched.update(found)
+        elif name in existing:
+            report.conflicting.append(name)
+        else:
+            report.missing.append(name)
+    report.undeclared = sorted(set(existing) - matched - {"_id_"})
+    try:
+        usage = index_usage()
+    except OperationFailure as exc:  # e.g. missing clusterMonitor role
+        logger.warning("$indexStats indisponível: %s", exc)
+        usage = {}
+    report.unused = sorted(
+        name for name in existing if name != "_id_" and usage.get(name) == 0
+    )
+    return report
+
+
+def ensure_indexes() -> IndexReport:
+    """Create the declared indexes that are missing.
+
+    Builds run in the background so ingestion keeps writing meanwhile.
+    A unique index that existing duplicates prevent from building is
+    reported as blocked; the duplicates are never deleted here, see the
+    ``remove_duplicate_leaks`` command. Conflicting definitions are only
+    reported.
+    """
+    report = check_indexes()
+    declared = _declared()
+    for name in list(report.missing):
+        try:
+            leaks_collection().create_indexes([declared[name]])
+        except OperationFailure as exc:
+            if exc.code != DUPLICATE_KEY_ERROR:
+                raise
+            logger.error(
+                "Índice %s bloqueado por leaks duplicados; execute "
+                "remove_duplicate_leaks",
+                name,
+            )
+            report.blocked.append(name)
+            continue
+        report.missing.remove(name)
+        report.created.append(name)
+        logger.info("Índice %s criado em leaks", name)
+    return report
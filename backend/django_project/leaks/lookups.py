@@ -0,0 +1,23 @@
+"""Custom lookups for leak text columns."""
+
+from django.db.models.lookups import IContains
+
+
+class TrigramIContains(IContains):
+    """Case-insensitive substring match served by pg_trgm indexes.
+
+    Postgres compiles ``icontains`` to ``UPPER(col::text) LIKE ...``,
+    which no index on the bare column can serve. ``col ILIKE '%...%'``
+    uses the ``gin_trgm_ops`` indexes created in migration 0005 instead.
+    Other databases run a plain ``icontains``.
+    """
+
+    lookup_name = "trgm_icontains"
+
+    def as_sql(self, compiler, connection):
+        return IContains(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs_sql} ILIKE {rhs_sql}", (*lhs_params, *rhs_params)
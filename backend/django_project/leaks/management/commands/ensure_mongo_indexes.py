@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from leaks.indexes import check_indexes, ensure_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the declared MongoDB indexes of the leaks collection and "
+        "report missing, undeclared and unused ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report; do not create missing indexes.",
+        )
+        parser.add_argument(
+            "--allow-blocked",
+            action="store_true",
+            help=(
+                "Report unique indexes blocked by duplicate leaks without "
+                "failing."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        report = check_indexes() if options["check"] else ensure_indexes()
+        for label, names in (
+            ("created", report.created),
+            ("missing", report.missing),
+            ("conflicting", report.conflicting),
+            ("undeclared", report.undeclared),
+            ("unused", report.unused),
+            ("blocked", report.blocked),
+        ):
+            if names:
+                self.stdout.write(f"{label}: {', '.join(names)}")
+        if report.blocked:
+            message = (
+                "Leaks duplicados impedem a criação de "
+                f"{', '.join(report.blocked)}; revise-os com "
+                "remove_duplicate_leaks --dry-run e remova-os com "
+                "remove_duplicate_leaks"
+            )
+            if not options["allow_blocked"]:
+                raise CommandError(message)
+            self.stderr.write(self.style.WARNING(message))
+        if not (report.missing or report.conflicting):
+            self.stdout.write(self.style.SUCCESS("Índices em dia"))
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from leaks.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recount the daily leak rollups from the Leak table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Only rebuild the last N days (default: all of them).",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["days"] is not None:
+            since = timezone.localdate() - timedelta(days=options["days"])
+        written = rebuild_rollups(since)
+        self.stdout.write(self.style.SUCCESS(f"{written} agregados gravados"))
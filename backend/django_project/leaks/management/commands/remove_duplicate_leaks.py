@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from leaks.mongo_utils import remove_duplicate_leaks
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete MongoDB leaks that repeat a (company, source_url) key, "
+        "keeping the oldest one. Needed before the unique index can be "
+        "built on legacy data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the duplicates; do not delete them.",
+        )
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            count = remove_duplicate_leaks(dry_run=True)
+            self.stdout.write(f"{count} leaks duplicados encontrados")
+            return
+        removed = remove_duplicate_leaks()
+        self.stdout.write(
+            self.style.SUCCESS(f"{removed} leaks duplicados removidos")
+        )
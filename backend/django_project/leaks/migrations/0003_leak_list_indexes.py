@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:08
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class AddIndex(AddIndexConcurrently):
+    """Build the index concurrently so a large leaks table stays writable.
+
+    Other databases (sqlite in tests) have no CONCURRENTLY and get a plain
+    index.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        return migrations.AddIndex.database_forwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        return migrations.AddIndex.database_backwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("leaks", "0002_leak_amount_of_data_leak_comment_leak_download_links_and_more"),
+        ("sites", "0005_site_frequency_minutes"),
+    ]
+
+    operations = [
+        AddIndex(
+            model_name="leak",
+            index=models.Index(fields=["-found_at", "-id"], name="leak_found_at_idx"),
+        ),
+        AddIndex(
+            model_name="leak",
+            index=models.Index(
+                fields=["site", "-found_at", "-id"], name="leak_site_found_at_idx"
+            ),
+        ),
+        AddIndex(
+            model_name="leak",
+            index=models.Index(
+                fields=["country", "-found_at", "-id"], name="leak_country_found_at_idx"
+            ),
+        ),
+        AddIndex(
+            model_name="leak",
+            index=models.Index(
+                fields=["company"],
+                name="leak_company_prefix_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+    ]
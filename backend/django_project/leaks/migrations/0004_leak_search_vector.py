@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:10
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Weights rank company matches above the description and the comment. The
+# "simple" configuration must match leaks.pg_search.SEARCH_CONFIG.
+CREATE_SEARCH_VECTOR = [
+    """
+    CREATE FUNCTION leaks_leak_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.company, '')), 'A')
+            || setweight(
+                to_tsvector('simple', coalesce(NEW.information, '')), 'B'
+            )
+            || setweight(to_tsvector('simple', coalesce(NEW.comment, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER leaks_leak_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF company, information, comment
+    ON leaks_leak
+    FOR EACH ROW EXECUTE FUNCTION leaks_leak_search_vector_update()
+    """,
+]
+
+# Existing rows are backfilled and indexed by 0009_leak_search_vector_index
+# outside this migration's transaction.
+DROP_SEARCH_VECTOR = [
+    "DROP TRIGGER IF EXISTS leaks_leak_search_vector_trigger ON leaks_leak",
+    "DROP FUNCTION IF EXISTS leaks_leak_search_vector_update()",
+]
+
+
+def _run_on_postgres(statements):
+    def run(apps, schema_editor):
+        # Other databases (sqlite in tests) keep search_vector NULL.
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leaks", "0003_leak_list_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="leak",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(
+            _run_on_postgres(CREATE_SEARCH_VECTOR),
+            _run_on_postgres(DROP_SEARCH_VECTOR),
+        ),
+    ]
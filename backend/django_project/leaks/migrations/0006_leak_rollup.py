@@ -0,0 +1,99 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    """Count the leaks that exist before rollups do, like rebuild_rollups."""
+    Leak = apps.get_model("leaks", "Leak")
+    LeakRollup = apps.get_model("leaks", "LeakRollup")
+    rows = (
+        Leak.objects.annotate(
+            day=TruncDate("found_at"),
+            bucket_country=Coalesce("country", Value("")),
+            bucket_type=Coalesce("site__type", Value("")),
+        )
+        .values("day", "site_id", "bucket_country", "bucket_type")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    LeakRollup.objects.bulk_create(
+        (
+            LeakRollup(
+                day=row["day"],
+                site_id=row["site_id"],
+                country=row["bucket_country"],
+                source_type=row["bucket_type"],
+                count=row["count"],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("leaks", "0005_leak_trigram_indexes"),
+        ("sites", "0005_site_frequency_minutes"),
+    ]
+
+    # Existing leaks are added as rolled up because backfill_rollups counts
+    # them below; leaks created afterwards start out uncounted and are
+    # counted once by leaks.rollups.record_leaks.
+    operations = [
+        migrations.AddField(
+            model_name="leak",
+            name="rolled_up",
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name="leak",
+            name="rolled_up",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name="LeakRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("country", models.CharField(blank=True, default="", max_length=255)),
+                (
+                    "source_type",
+                    models.CharField(blank=True, default="", max_length=20),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "site",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="sites.site",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "site", "country", "source_type"),
+                        name="leak_rollup_bucket_uniq",
+                        nulls_distinct=False,
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
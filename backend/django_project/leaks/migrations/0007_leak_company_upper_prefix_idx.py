@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Serves company__istartswith, which Postgres compiles to
+# UPPER(company::text) LIKE 'PREFIX%'. The expression must match that
+# SQL exactly, and text_pattern_ops lets LIKE use the index under any
+# collation. Other databases do not need it.
+INDEX = "leak_company_upper_prefix_idx"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX} "
+        "ON leaks_leak ((UPPER(company::text)) text_pattern_ops)"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("leaks", "0006_leak_rollup"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+# Fills search_vector for the rows that predate the trigger of 0004 and
+# indexes it. Runs outside a transaction: each batch commits on its own
+# and the index is built concurrently, so a large leaks table stays
+# writable throughout.
+BATCH_SIZE = 5000
+INDEX = "leak_search_vector_idx"
+
+
+def backfill_and_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT max(id) FROM leaks_leak")
+        last_id = cursor.fetchone()[0] or 0
+        for start in range(0, last_id, BATCH_SIZE):
+            # Fires the search vector trigger for the rows of the batch.
+            cursor.execute(
+                "UPDATE leaks_leak SET company = company "
+                "WHERE id > %s AND id <= %s AND search_vector IS NULL",
+                [start, start + BATCH_SIZE],
+            )
+    schema_editor.execute(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX} "
+        "ON leaks_leak USING gin (search_vector)"
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("leaks", "0008_leak_outbox"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_and_index, drop_index),
+    ]
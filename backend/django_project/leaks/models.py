@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 
@@ -16,10 +17,81 @@ class Leak(models.Model):
     comment = models.TextField(blank=True, null=True)
     download_links = models.JSONField(blank=True, null=True)
     rar_password = models.CharField(max_length=255, blank=True, null=True)
+    # Maintained by a Postgres trigger from company, information and
+    # comment (see migration 0004); always NULL on other databases.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Set once the leak is counted in LeakRollup (see leaks.rollups).
+    rolled_up = models.BooleanField(default=False, editable=False)
 
     class Meta:
         unique_together = ("company", "source_url")
         ordering = ["-found_at"]
+        # Each index serves a filter of ``filters.filter_leaks`` combined
+        # with the (found_at, id) cursor order of the list endpoint.
+        indexes = [
+            models.Index(
+                fields=["-found_at", "-id"], name="leak_found_at_idx"
+            ),
+            models.Index(
+                fields=["site", "-found_at", "-id"],
+                name="leak_site_found_at_idx",
+            ),
+            models.Index(
+                fields=["country", "-found_at", "-id"],
+                name="leak_country_found_at_idx",
+            ),
+            # Pattern ops let Postgres use the index for LIKE 'prefix%'
+            # regardless of the database collation.
+            models.Index(
+                fields=["company"],
+                name="leak_company_prefix_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.company} - {self.source_url}"
+
+
+class LeakOutbox(models.Model):
+    """Ids of new leaks waiting to be relayed to the post-ingest stream.
+
+    Rows are written in the transaction that creates the leaks, so a
+    committed leak reaches the pipeline even if Redis was unreachable at
+    the time; see ``leaks.pipeline``.
+    """
+
+    leak_ids = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:  # pragma: no cover - simple repr
+        return f"Outbox {self.id}: {len(self.leak_ids)} leaks"
+
+
+class LeakRollup(models.Model):
+    """Number of leaks found per day, site, country and source type.
+
+    Kept up to date by ``leaks.rollups`` so dashboards read one row per
+    bucket instead of counting leaks. Each bucket is a single row; a
+    missing ``site`` is its own bucket rather than a distinct NULL.
+    """
+
+    day = models.DateField()
+    site = models.ForeignKey(
+        "sites.Site", on_delete=models.CASCADE, null=True, blank=True
+    )
+    country = models.CharField(max_length=255, blank=True, default="")
+    source_type = models.CharField(max_length=20, blank=True, default="")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "site", "country", "source_type"],
+                name="leak_rollup_bucket_uniq",
+                nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - simple repr
+        return f"{self.day} {self.site_id} {self.country}: {self.count}"
@@ -1,32 +1,106 @@
 """MongoDB utility helpers."""
 
-from pymongo import MongoClient
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
 from django.conf import settings
+from django.db import transaction
 from .documents import LeakDoc
 from .models import Leak
+from .pagination import LeakPage, after, decode_cursor, encode_cursor
+from .search import use_text_search
+from .search_cache import bump_search_version
+from .pipeline import publish_leaks
+from sites.cache import get_site, get_sites
 from sites.models import Site
 
-client = MongoClient(settings.MONGODB_URI)
-mongo_db = client[settings.MONGODB_DB]
+logger = logging.getLogger(__name__)
 
-INDEXES_INITIALIZED = False
+_client: Optional[MongoClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
 
+DUPLICATE_KEY_ERROR = 11000
 
-def insert_leak(doc: LeakDoc) -> str:
-    """Insert a leak document into MongoDB."""
-    # ``model_dump(mode="json")`` ensures all fields are JSON serialisable,
-    # converting types like ``HttpUrl`` to plain strings.
-    if not INDEXES_INITIALIZED:
-        init_mongo_indexes()
-    result = mongo_db.leaks.insert_one(doc.model_dump(mode="json"))
+# Fields returned by read queries. ``_id`` is fetched for the pagination
+# cursor and stripped before documents leave this module.
+LEAK_PROJECTION = {**dict.fromkeys(LeakDoc.model_fields, 1), "last_seen_at": 1}
 
-    # Create relational DB entry, avoiding duplicates based on unique fields
-    try:
-        site = Site.objects.get(id=doc.site_id)
-    except Site.DoesNotExist:  # pragma: no cover - should not happen in tests
-        site = None
+# Case-insensitive collation of the ``company_prefix_idx`` index; prefix
+# searches must query with the same collation to use it.
+COMPANY_COLLATION = {"locale": "en", "strength": 2}
+
+
+@dataclass
+class BulkInsertResult:
+    inserted: int
+    duplicates: int
+
+
+def get_mongo_client() -> MongoClient:
+    """Return the MongoDB client of the current process.
+
+    The client is created on first use, so processes that never touch
+    MongoDB open no connections, and it is recreated after a fork because
+    pymongo clients must not be shared with child processes.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = MongoClient(
+                settings.MONGODB_URI,
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                serverSelectionTimeoutMS=(
+                    settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS
+                ),
+                connect=False,
+            )
+            _client_pid = os.getpid()
+        return _client
+
+
+def get_mongo_db() -> Database:
+    return get_mongo_client()[settings.MONGODB_DB]
+
+
+def leaks_collection() -> Collection:
+    return get_mongo_db().leaks
 
-    defaults = {
+
+def reset_mongo_client() -> None:
+    """Forget the client so the next call opens fresh connections.
+
+    Used after a fork, where the inherited client belongs to the parent;
+    it is dropped without closing so the parent's sockets stay intact.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        _client = None
+        _client_pid = None
+
+
+def close_mongo_client() -> None:
+    """Close the client of the current process, if any."""
+    global _client, _client_pid
+    with _client_lock:
+        client, _client = _client, None
+        owned = _client_pid == os.getpid()
+        _client_pid = None
+    if client is not None and owned:
+        client.close()
+
+
+def _leak_defaults(doc: LeakDoc, site: Optional[Site]) -> dict:
+    return {
         "site": site,
         "country": doc.country,
         "found_at": doc.found_at,
@@ -40,78 +114,265 @@ def insert_leak(doc: LeakDoc) -> str:
         else None,
         "rar_password": doc.rar_password,
     }
+
+
+def _leak_upsert(doc: LeakDoc, seen_at: datetime) -> tuple[dict, dict]:
+    """Return the filter and update that upsert ``doc`` by its key.
+
+    A rescraped leak keeps its original document and only has
+    ``last_seen_at`` refreshed.
+    """
+    # ``model_dump(mode="json")`` ensures all fields are JSON serialisable,
+    # converting types like ``HttpUrl`` to plain strings.
+    data = doc.model_dump(mode="json")
+    key = {"company": data["company"], "source_url": data["source_url"]}
+    update = {"$setOnInsert": data, "$set": {"last_seen_at": seen_at}}
+    return key, update
+
+
+def insert_leak(doc: LeakDoc) -> str:
+    """Upsert a leak document into MongoDB and return its id."""
+    key, update = _leak_upsert(doc, datetime.now(timezone.utc))
+    stored = leaks_collection().find_one_and_update(
+        key,
+        update,
+        projection={"_id": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+    # Create relational DB entry, avoiding duplicates based on unique fields
+    try:
+        site = get_site(doc.site_id)
+    except Site.DoesNotExist:  # pragma: no cover - should not happen in tests
+        site = None
+
     Leak.objects.get_or_create(
         company=doc.company,
         source_url=str(doc.source_url),
-        defaults=defaults,
+        defaults=_leak_defaults(doc, site),
     )
+    transaction.on_commit(bump_search_version)
 
-    return str(result.inserted_id)
+    return str(stored["_id"])
 
 
-def find_leaks_by_site(
-    site_id: int, skip: int = 0, limit: int = 50
-) -> list[LeakDoc]:
-    if not INDEXES_INITIALIZED:
-        init_mongo_indexes()
-    cursor = mongo_db.leaks.find({"site_id": site_id}).skip(skip).limit(
-        limit
+def insert_leaks(docs: Iterable[LeakDoc]) -> BulkInsertResult:
+    """Insert a batch of leak documents into MongoDB and Postgres.
+
+    MongoDB receives a single unordered ``bulk_write`` of upserts and
+    Postgres a single ``bulk_create``, so a batch costs a handful of round
+    trips instead of three per leak. Leaks already known by
+    ``(company, source_url)``, or upserted first by another worker, are
+    counted as duplicates.
+    """
+    docs = list(docs)
+    if not docs:
+        return BulkInsertResult(inserted=0, duplicates=0)
+    seen_at = datetime.now(timezone.utc)
+    try:
+        result = leaks_collection().bulk_write(
+            [
+                UpdateOne(*_leak_upsert(doc, seen_at), upsert=True)
+                for doc in docs
+            ],
+            ordered=False,
+        )
+        details = result.bulk_api_result
+    except BulkWriteError as exc:
+        # Concurrent upserts of the same new key race on the unique index;
+        # the losing write is a duplicate, not a failure.
+        errors = exc.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY_ERROR for err in errors):
+            raise
+        logger.debug("%d leaks duplicados ignorados no MongoDB", len(errors))
+        details = exc.details
+    # These are the leaks this call created. Once company_source_url_uniq
+    # is built, exactly one writer upserts each key whatever other workers
+    # do; until ensure_mongo_indexes can build it (see remove_duplicate_
+    # leaks), racing workers may each insert and report the same key.
+    upserted = {
+        (docs[item["index"]].company, str(docs[item["index"]].source_url))
+        for item in details.get("upserted", [])
+    }
+
+    sites = get_sites({doc.site_id for doc in docs})
+    keys = {(doc.company, str(doc.source_url)) for doc in docs}
+    seen = {
+        key
+        for key in Leak.objects.filter(
+            company__in={company for company, _ in keys},
+            source_url__in={url for _, url in keys},
+        ).values_list("company", "source_url")
+        if key in keys
+    }
+    new_leaks = []
+    for doc in docs:
+        key = (doc.company, str(doc.source_url))
+        if key in seen:
+            continue
+        seen.add(key)
+        new_leaks.append(
+            Leak(
+                company=doc.company,
+                source_url=str(doc.source_url),
+                **_leak_defaults(doc, sites.get(doc.site_id)),
+            )
+        )
+
+    created = []
+    if new_leaks:
+        # ``ignore_conflicts`` leaves primary keys unset, so read the new
+        # rows back for the post-ingest pipeline. Rows a concurrent worker
+        # inserted meanwhile also match; only keys upserted above in
+        # MongoDB belong to this batch. The pipeline outbox commits with
+        # the rows.
+        with transaction.atomic():
+            Leak.objects.bulk_create(new_leaks, ignore_conflicts=True)
+            new_keys = {
+                (leak.company, leak.source_url) for leak in new_leaks
+            } & upserted
+            created = [
+                leak
+                for leak in Leak.objects.filter(
+                    company__in={company for company, _ in new_keys},
+                    source_url__in={url for _, url in new_keys},
+                )
+                if (leak.company, leak.source_url) in new_keys
+            ]
+            publish_leaks(leak.pk for leak in created)
+
+    if upserted:
+        # Rescrapes only refresh last_seen_at and leave results unchanged.
+        transaction.on_commit(bump_search_version)
+    return BulkInsertResult(
+        inserted=len(created), duplicates=len(docs) - len(created)
     )
-    docs = list(cursor)
-    return [LeakDoc(**d) for d in docs]
 
 
-def search_leaks(query: str, skip: int = 0, limit: int = 50) -> list[LeakDoc]:
-    """Return leaks matching the given text query.
+def _page(docs: list, limit: int, key: str) -> LeakPage:
+    """Build a page from up to ``limit + 1`` sorted documents.
 
-    The search is case-insensitive and performs a ``contains`` lookup across
-    the ``company``, ``information`` and ``comment`` fields.
+    Documents were validated by ``LeakDoc`` and dumped to JSON types on
+    insert, so they are returned as plain dicts without re-validation.
     """
-    if not INDEXES_INITIALIZED:
-        init_mongo_indexes()
-    regex = {"$regex": query, "$options": "i"}
-    cursor = (
-        mongo_db.leaks.find(
-            {
-                "$or": [
-                    {"company": regex},
-                    {"information": regex},
-                    {"comment": regex},
-                ]
-            }
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(key, last.get(key), last["_id"])
+    for doc in docs:
+        del doc["_id"]
+    return LeakPage(results=docs, next_cursor=next_cursor)
+
+
+def find_leaks_by_site(
+    site_id: int, cursor: Optional[str] = None, limit: int = 50
+) -> LeakPage:
+    """Return the leaks of a site, newest first, one page at a time.
+
+    Pages are delimited by a ``(found_at, _id)`` keyset rather than
+    ``skip``, so deep pages cost the same as the first one.
+    """
+    query: dict = {"site_id": site_id}
+    if cursor:
+        found_at, doc_id = decode_cursor(cursor, "found_at")
+        query = {"$and": [query, after("found_at", found_at, doc_id, True)]}
+    docs = list(
+        leaks_collection().find(
+            query, LEAK_PROJECTION, max_time_ms=settings.MONGODB_MAX_TIME_MS
         )
-        .skip(skip)
-        .limit(limit)
+        .sort([("found_at", -1), ("_id", -1)])
+        .limit(limit + 1)
     )
-    docs = list(cursor)
-    return [LeakDoc(**d) for d in docs]
-
-
-def init_mongo_indexes() -> None:
-    """Ensure MongoDB indexes needed by the application exist."""
-    global INDEXES_INITIALIZED
-    indexes = mongo_db.leaks.index_information()
-    site_index_spec = [("site_id", 1)]
-    has_site_idx = any(
-        index.get("key") == site_index_spec
-        for index in indexes.values()
+    return _page(docs, limit, "found_at")
+
+
+def search_leaks(
+    query: str, cursor: Optional[str] = None, limit: int = 50
+) -> LeakPage:
+    """Return leaks matching the given text query, most relevant first.
+
+    Whole words go through the ``text_search`` index and are ranked by
+    ``textScore``. Queries with short, possibly partial tokens (e.g.
+    ``"ac"``) cannot be served by the text index, which only matches
+    whole stemmed words, so they fall back to a case-insensitive prefix
+    match on ``company``. Both paths paginate with a keyset cursor on
+    their sort key and ``_id``.
+
+    A case-insensitive ``$regex`` cannot bound an index scan, so the prefix
+    is matched as a range under ``COMPANY_COLLATION`` instead. ``\uffff``
+    sorts after every other character in ICU collations, which makes
+    ``[query, query + "\uffff")`` exactly the strings starting with
+    ``query``.
+    """
+    if use_text_search(query):
+        # The score is only known after the $text stage, so the keyset is
+        # applied in an aggregation rather than in the find filter.
+        pipeline: list = [
+            {"$match": {"$text": {"$search": query}}},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+        ]
+        if cursor:
+            score, doc_id = decode_cursor(cursor, "score")
+            pipeline.append({"$match": after("score", score, doc_id, True)})
+        pipeline += [
+            {"$sort": {"score": -1, "_id": -1}},
+            {"$limit": limit + 1},
+            {"$project": {**LEAK_PROJECTION, "score": 1}},
+        ]
+        docs = list(
+            leaks_collection().aggregate(
+                pipeline, maxTimeMS=settings.MONGODB_MAX_TIME_MS
+            )
+        )
+        return _page(docs, limit, "score")
+
+    prefix = {"$gte": query, "$lt": query + "\uffff"}
+    filters: dict = {"company": prefix}
+    if cursor:
+        company, doc_id = decode_cursor(cursor, "company")
+        filters = {"$and": [filters, after("company", company, doc_id, False)]}
+    docs = list(
+        leaks_collection().find(
+            filters,
+            LEAK_PROJECTION,
+            collation=COMPANY_COLLATION,
+            max_time_ms=settings.MONGODB_MAX_TIME_MS,
+        )
+        .sort([("company", 1), ("_id", 1)])
+        .limit(limit + 1)
     )
-    if not has_site_idx:
-        mongo_db.leaks.create_index("site_id", name="site_id_idx")
-
-    text_index_spec = [
-        ("company", "text"),
-        ("information", "text"),
-        ("comment", "text"),
-    ]
-    expected_weights = {
-        "company": 1,
-        "information": 1,
-        "comment": 1,
-    }
-    has_text_idx = any(
-        index.get("weights") == expected_weights for index in indexes.values()
+    return _page(docs, limit, "company")
+
+
+def remove_duplicate_leaks(dry_run: bool = False) -> int:
+    """Keep the oldest document of each ``(company, source_url)`` key.
+
+    Returns how many documents were removed, or would be with
+    ``dry_run``.
+    """
+    groups = leaks_collection().aggregate(
+        [
+            {"$sort": {"_id": 1}},
+            {
+                "$group": {
+                    "_id": {"company": "$company", "url": "$source_url"},
+                    "ids": {"$push": "$_id"},
+                    "count": {"$sum": 1},
+                }
+            },
+            {"$match": {"count": {"$gt": 1}}},
+        ],
+        allowDiskUse=True,
     )
-    if not has_text_idx:
-        mongo_db.leaks.create_index(text_index_spec, name="text_search")
-    INDEXES_INITIALIZED = True
+    extra = [doc_id for group in groups for doc_id in group["ids"][1:]]
+    if dry_run:
+        return len(extra)
+    removed = 0
+    for start in range(0, len(extra), 1000):
+        chunk = extra[start:start + 1000]
+        removed += leaks_collection().delete_many(
+            {"_id": {"$in": chunk}}
+        ).deleted_count
+    return removed
@@ -0,0 +1,81 @@
+"""Full-text leak search on the ``Leak.search_vector`` column."""
+
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+
+from .models import Leak
+from .pagination import LeakPage, decode_cursor, encode_cursor
+from .search import use_text_search
+
+# Must match the configuration of the trigger in migration 0004.
+SEARCH_CONFIG = "simple"
+
+# Same keys as the documents returned by the Mongo backend.
+RESULT_FIELDS = (
+    "site_id",
+    "company",
+    "source_url",
+    "found_at",
+    "country",
+    "views",
+    "publication_date",
+    "amount_of_data",
+    "information",
+    "comment",
+    "download_links",
+    "rar_password",
+)
+
+
+def search_leaks(
+    query: str, cursor: Optional[str] = None, limit: int = 50
+) -> LeakPage:
+    """Return leaks matching ``query``, best ``ts_rank`` first.
+
+    Mirrors the Mongo backend: whole words use the GIN-indexed
+    ``search_vector`` with web-search syntax, short tokens fall back to a
+    case-insensitive company prefix, and both paginate with a keyset on
+    their sort key and ``id``. Reads go to ``LEAK_SEARCH_DATABASE`` so
+    they can be served by a replica.
+    """
+    leaks = Leak.objects.using(settings.LEAK_SEARCH_DATABASE)
+    if use_text_search(query):
+        search = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type="websearch"
+        )
+        # ts_rank returns real; as double precision the score stored in
+        # the cursor compares equal to the row it came from.
+        rows = leaks.filter(search_vector=search).annotate(
+            score=Cast(SearchRank(F("search_vector"), search), FloatField())
+        )
+        key, order, fields = "score", ("-score", "-id"), ("score",)
+        if cursor:
+            score, pk = decode_cursor(cursor, key)
+            rows = rows.filter(Q(score__lt=score) | Q(score=score, id__lt=pk))
+    else:
+        # Uses leak_company_upper_prefix_idx (migration 0007).
+        rows = leaks.filter(company__istartswith=query)
+        key, order, fields = "company", ("company", "id"), ()
+        if cursor:
+            company, pk = decode_cursor(cursor, key)
+            rows = rows.filter(
+                Q(company__gt=company) | Q(company=company, id__gt=pk)
+            )
+
+    results = list(
+        rows.order_by(*order).values("id", *RESULT_FIELDS, *fields)[
+            : limit + 1
+        ]
+    )
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        last = results[-1]
+        next_cursor = encode_cursor(key, last[key], last["id"])
+    for row in results:
+        del row["id"]
+    return LeakPage(results=results, next_cursor=next_cursor)
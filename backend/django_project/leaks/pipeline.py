@@ -0,0 +1,212 @@
+"""Post-ingest pipeline for newly created leaks.
+
+Ingestion only publishes the ids of the leaks it created; receivers of
+``leaks_created`` (alert matching, rollups) run later in a consumer so
+they never slow scrapers down. With the ``redis`` backend ids are first
+written to ``LeakOutbox`` in the ingest transaction, then relayed to a
+Redis stream read through a consumer group: entries stay pending until
+acknowledged, so a consumer that dies mid-batch leaves them to be
+reclaimed by the next run instead of losing them. The ``inline``
+backend runs the receivers immediately, for tests and single-process
+setups.
+"""
+
+import logging
+import os
+import socket
+import threading
+from typing import Iterable, Optional
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Leak, LeakOutbox
+from .signals import leaks_created
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional[redis.Redis] = None
+_redis_lock = threading.Lock()
+
+
+def get_pipeline_redis() -> redis.Redis:
+    global _redis
+    with _redis_lock:
+        if _redis is None:
+            # redis-py pools reconnect after a fork on their own.
+            _redis = redis.Redis.from_url(settings.LEAK_PIPELINE_REDIS_URL)
+        return _redis
+
+
+def process_leaks(leak_ids: Iterable[int]) -> int:
+    """Send ``leaks_created`` for the leaks still present in ``leak_ids``."""
+    leaks = list(Leak.objects.filter(pk__in=set(leak_ids)))
+    if leaks:
+        leaks_created.send(sender=Leak, leaks=leaks)
+    return len(leaks)
+
+
+def publish_leaks(leak_ids: Iterable[int]) -> None:
+    """Hand newly created leaks to the post-ingest pipeline."""
+    leak_ids = [int(pk) for pk in leak_ids]
+    if not leak_ids:
+        return
+    if settings.LEAK_PIPELINE_BACKEND == "inline":
+        process_leaks(leak_ids)
+        return
+    # Commits or rolls back with the leaks; relay_outbox moves it on.
+    LeakOutbox.objects.create(leak_ids=leak_ids)
+
+
+@receiver(post_save, sender=Leak)
+def publish_saved_leak(sender, instance, created, **kwargs):
+    # bulk_create skips post_save; insert_leaks publishes those itself.
+    if created:
+        publish_leaks([instance.pk])
+
+
+def relay_outbox(batch_size: int = 500, max_batches: int = 50) -> int:
+    """Move committed ``LeakOutbox`` rows to the stream; return how many.
+
+    Rows are deleted only once Redis accepted them, in the transaction
+    that locked them, so an unreachable Redis leaves them for the next
+    run. A crash between the two relays a row twice; receivers of
+    ``leaks_created`` tolerate repeated leaks.
+    """
+    relayed = 0
+    for _ in range(max_batches):
+        with transaction.atomic():
+            rows = list(
+                LeakOutbox.objects.select_for_update(skip_locked=True)
+                .order_by("id")[:batch_size]
+            )
+            if not rows:
+                break
+            pipe = get_pipeline_redis().pipeline(transaction=False)
+            for row in rows:
+                pipe.xadd(
+                    settings.LEAK_PIPELINE_STREAM,
+                    {"ids": ",".join(map(str, row.leak_ids))},
+                    maxlen=settings.LEAK_PIPELINE_MAXLEN,
+                    approximate=True,
+                )
+            pipe.execute()
+            LeakOutbox.objects.filter(pk__in=[row.pk for row in rows]).delete()
+        relayed += len(rows)
+        if len(rows) < batch_size:
+            break
+    return relayed
+
+
+def _ensure_group(client: redis.Redis) -> None:
+    try:
+        client.xgroup_create(
+            settings.LEAK_PIPELINE_STREAM,
+            settings.LEAK_PIPELINE_GROUP,
+            id="0",
+            mkstream=True,
+        )
+    except redis.ResponseError as exc:
+        if "BUSYGROUP" not in str(exc):
+            raise
+
+
+def _consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _dead_letter(client: redis.Redis, count: int) -> int:
+    """Move entries delivered ``LEAK_PIPELINE_MAX_DELIVERIES`` times.
+
+    They go to ``LEAK_PIPELINE_DEAD_LETTER_STREAM`` with their original
+    id and delivery count, so a poison entry stops being reclaimed and
+    can be inspected or re-added by hand.
+    """
+    stream = settings.LEAK_PIPELINE_STREAM
+    group = settings.LEAK_PIPELINE_GROUP
+    moved = 0
+    for item in client.xpending_range(
+        stream,
+        group,
+        min="-",
+        max="+",
+        count=count,
+        idle=settings.LEAK_PIPELINE_CLAIM_IDLE_MS,
+    ):
+        deliveries = item["times_delivered"]
+        if deliveries < settings.LEAK_PIPELINE_MAX_DELIVERIES:
+            continue
+        entry_id = item["message_id"]
+        for _, fields in client.xrange(stream, min=entry_id, max=entry_id):
+            client.xadd(
+                settings.LEAK_PIPELINE_DEAD_LETTER_STREAM,
+                {**fields, "entry_id": entry_id, "deliveries": deliveries},
+            )
+        client.xack(stream, group, entry_id)
+        logger.error(
+            "Entrada %s descartada após %d tentativas", entry_id, deliveries
+        )
+        moved += 1
+    return moved
+
+
+def consume_leaks(batch_size: int = 100, max_batches: int = 50) -> int:
+    """Process pending pipeline entries and return how many were acked.
+
+    Entries left unacknowledged for ``LEAK_PIPELINE_CLAIM_IDLE_MS`` by a
+    crashed consumer are claimed first, unless they already failed too
+    often (see ``_dead_letter``); new entries follow. An entry is
+    acknowledged only after its receivers ran, so the consumer group's
+    position is the checkpoint. A retried entry runs every receiver
+    again, so receivers of ``leaks_created`` must be idempotent.
+    """
+    client = get_pipeline_redis()
+    stream = settings.LEAK_PIPELINE_STREAM
+    group = settings.LEAK_PIPELINE_GROUP
+    consumer = _consumer_name()
+    _ensure_group(client)
+    _dead_letter(client, batch_size)
+
+    _, entries, *_ = client.xautoclaim(
+        stream,
+        group,
+        consumer,
+        min_idle_time=settings.LEAK_PIPELINE_CLAIM_IDLE_MS,
+        start_id="0-0",
+        count=batch_size,
+    )
+    acked = _handle(client, entries)
+    for _ in range(max_batches):
+        response = client.xreadgroup(
+            group, consumer, {stream: ">"}, count=batch_size
+        )
+        entries = response[0][1] if response else []
+        if not entries:
+            break
+        acked += _handle(client, entries)
+    return acked
+
+
+def _handle(client: redis.Redis, entries: list) -> int:
+    acked = 0
+    for entry_id, fields in entries:
+        raw = fields.get(b"ids") or fields.get("ids") or b""
+        if isinstance(raw, bytes):
+            raw = raw.decode()
+        try:
+            process_leaks(int(pk) for pk in raw.split(",") if pk)
+        except Exception:
+            # Left pending; it is reclaimed once it has been idle long
+            # enough.
+            logger.exception("Falha ao processar entrada %s", entry_id)
+            continue
+        client.xack(
+            settings.LEAK_PIPELINE_STREAM,
+            settings.LEAK_PIPELINE_GROUP,
+            entry_id,
+        )
+        acked += 1
+    return acked
@@ -0,0 +1,185 @@
+"""Daily leak counts by site, country and source type."""
+
+from collections import Counter
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.dispatch import receiver
+from django.utils import timezone
+
+from sites.cache import get_sites
+
+from .models import Leak, LeakRollup
+from .signals import leaks_created
+
+Bucket = Tuple[date, Optional[int], str, str]
+
+
+def _buckets(leaks: Iterable[Leak]) -> Counter:
+    leaks = list(leaks)
+    sites = get_sites({leak.site_id for leak in leaks if leak.site_id})
+    counts: Counter = Counter()
+    for leak in leaks:
+        site = sites.get(leak.site_id)
+        counts[
+            (
+                timezone.localdate(leak.found_at),
+                leak.site_id,
+                leak.country or "",
+                site.type if site else "",
+            )
+        ] += 1
+    return counts
+
+
+def _upsert(buckets: List[Tuple[Bucket, int]]) -> None:
+    """Add each count to its bucket row, creating missing rows.
+
+    One ``INSERT ... ON CONFLICT`` against ``leak_rollup_bucket_uniq``
+    creates and increments buckets atomically, so racing writers never
+    split a bucket. Databases without ``NULLS NOT DISTINCT`` (SQLite,
+    which serialises writers anyway) update then create row by row.
+    """
+    if not buckets:
+        return
+    if not connection.features.supports_nulls_distinct_unique_constraints:
+        for (day, site_id, country, source_type), count in buckets:
+            key = dict(
+                day=day,
+                site_id=site_id,
+                country=country,
+                source_type=source_type,
+            )
+            updated = LeakRollup.objects.filter(**key).update(
+                count=F("count") + count
+            )
+            if not updated:
+                LeakRollup.objects.create(count=count, **key)
+        return
+    quote = connection.ops.quote_name
+    table = quote(LeakRollup._meta.db_table)
+    columns = ", ".join(
+        quote(name)
+        for name in ("day", "site_id", "country", "source_type", "count")
+    )
+    key = ", ".join(
+        quote(name) for name in ("day", "site_id", "country", "source_type")
+    )
+    values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(buckets))
+    params = [
+        field for bucket, count in buckets for field in (*bucket, count)
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) VALUES {values} "
+            f"ON CONFLICT ({key}) DO UPDATE "
+            f"SET {quote('count')} = {table}.{quote('count')} "
+            f"+ EXCLUDED.{quote('count')}",
+            params,
+        )
+
+
+def record_leaks(leaks: Iterable[Leak]) -> None:
+    """Add the ``leaks`` not counted yet to their daily buckets.
+
+    Leaks are marked ``rolled_up`` in the transaction that increments
+    their buckets, so a pipeline entry delivered twice counts once.
+    """
+    with transaction.atomic():
+        fresh = list(
+            Leak.objects.select_for_update()
+            .filter(pk__in=[leak.pk for leak in leaks], rolled_up=False)
+            .order_by("pk")
+        )
+        if not fresh:
+            return
+        Leak.objects.filter(pk__in=[leak.pk for leak in fresh]).update(
+            rolled_up=True
+        )
+        # A fixed order makes concurrent writers lock buckets in the same
+        # order instead of deadlocking.
+        _upsert(sorted(_buckets(fresh).items(), key=lambda item: str(item[0])))
+
+
+@receiver(leaks_created)
+def record_created_leaks(sender, leaks, **kwargs):
+    record_leaks(leaks)
+
+
+ROLLUP_DIMENSIONS = ("site", "country", "source_type")
+
+
+def rollup_counts(
+    start: date,
+    end: date,
+    group_by: Iterable[str] = ROLLUP_DIMENSIONS,
+    **filters,
+) -> List[dict]:
+    """Return daily leak counts between ``start`` and ``end`` inclusive.
+
+    ``group_by`` picks which of ``ROLLUP_DIMENSIONS`` stay separate; the
+    others are summed into the day's total. ``filters`` narrow the
+    buckets, e.g. ``country="BR"``.
+    """
+    fields = ["day", *group_by]
+    rows = (
+        LeakRollup.objects.filter(day__gte=start, day__lte=end, **filters)
+        .values(*fields)
+        .annotate(total=Sum("count"))
+        .order_by(*fields)
+    )
+    return [
+        {**{name: row[name] for name in fields}, "count": row["total"]}
+        for row in rows
+    ]
+
+
+def rebuild_rollups(since: Optional[date] = None) -> int:
+    """Recount the buckets from ``since`` (or all of them) from ``Leak``.
+
+    Repairs drift from deleted leaks or receivers that never ran. Only
+    leaks marked ``rolled_up`` are counted; the others are still queued
+    for ``record_leaks``, which would count them a second time. On
+    PostgreSQL the rollup table is locked against writes before the
+    recount, so increments that commit during the rebuild wait for it and
+    apply on top instead of being deleted with the old rows. Returns the
+    number of buckets written.
+    """
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "LOCK TABLE %s IN SHARE ROW EXCLUSIVE MODE"
+                    % connection.ops.quote_name(LeakRollup._meta.db_table)
+                )
+        leaks = Leak.objects.filter(rolled_up=True)
+        rollups = LeakRollup.objects.all()
+        if since is not None:
+            leaks = leaks.filter(found_at__date__gte=since)
+            rollups = rollups.filter(day__gte=since)
+        rows = (
+            leaks.annotate(
+                day=TruncDate("found_at"),
+                bucket_country=Coalesce("country", Value("")),
+                bucket_type=Coalesce("site__type", Value("")),
+            )
+            .values("day", "site_id", "bucket_country", "bucket_type")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        buckets = [
+            LeakRollup(
+                day=row["day"],
+                site_id=row["site_id"],
+                country=row["bucket_country"],
+                source_type=row["bucket_type"],
+                count=row["count"],
+            )
+            for row in rows
+        ]
+        rollups.delete()
+        LeakRollup.objects.bulk_create(buckets, batch_size=1000)
+    return len(buckets)
@@ -0,0 +1,55 @@
+"""Leak search entry point: picks the configured backend and caches pages."""
+
+import re
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .pagination import LeakPage
+from .search_cache import get_cached_page, normalize_query, store_page
+
+SEARCH_BACKENDS = {
+    "mongo": "leaks.mongo_utils.search_leaks",
+    "postgres": "leaks.pg_search.search_leaks",
+}
+
+
+def get_search_backend(name: str) -> Callable[..., LeakPage]:
+    try:
+        return import_string(SEARCH_BACKENDS[name])
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"LEAK_SEARCH_BACKEND inválido: {name!r}"
+        ) from None
+
+
+def use_text_search(query: str) -> bool:
+    """Whether every token of ``query`` is long enough for a text index."""
+    tokens = re.findall(r"\w+", query)
+    return bool(tokens) and all(
+        len(token) >= settings.LEAK_SEARCH_MIN_TEXT_TOKEN for token in tokens
+    )
+
+
+def search_leaks(
+    query: str,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    backend: Optional[str] = None,
+) -> LeakPage:
+    """Search leaks with ``backend`` (default ``LEAK_SEARCH_BACKEND``).
+
+    Both backends return the same page shape, so callers and cached pages
+    do not depend on where the search ran. Pages are cached until new
+    leaks are ingested; see ``search_cache``.
+    """
+    backend = backend or settings.LEAK_SEARCH_BACKEND
+    search = get_search_backend(backend)
+    query = normalize_query(query)
+    cache_key, page = get_cached_page(backend, query, cursor, limit)
+    if page is None:
+        page = search(query, cursor=cursor, limit=limit)
+        store_page(cache_key, page)
+    return page
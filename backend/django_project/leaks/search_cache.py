@@ -0,0 +1,111 @@
+"""Versioned cache of leak search pages.
+
+Cached pages are keyed by the normalized query, cursor and page size
+under a global version number. Ingestion bumps the version whenever new
+leaks are stored, which orphans every cached page at once instead of
+tracking which queries a new leak would match. The bump waits for the
+Postgres commit: bumping earlier would let a search in between cache a
+page without the new rows under the new version.
+
+The version must be shared by every process, so pages are only cached
+when ``LEAK_SEARCH_CACHE_ENABLED`` is set, which by default requires
+``CACHE_REDIS_URL``. With per-process caches a worker's ingestion would
+leave stale pages in the web processes until they expire.
+"""
+
+import hashlib
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Leak
+from .pagination import LeakPage
+
+VERSION_KEY = "leaks:search:version"
+HITS_KEY = "leaks:search:hits"
+MISSES_KEY = "leaks:search:misses"
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase ``query`` and collapse whitespace.
+
+    Both search paths are case-insensitive, so equivalent spellings of
+    a query share one cache entry.
+    """
+    return " ".join(query.lower().split())
+
+
+def _version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost or evicted version never repeats
+        # one that may still have cached pages.
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_search_version() -> None:
+    """Invalidate every cached search page."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+@receiver(post_save, sender=Leak)
+def invalidate_on_saved_leak(sender, instance, created, **kwargs):
+    # bulk_create skips post_save; insert_leaks bumps for those itself.
+    if created:
+        transaction.on_commit(bump_search_version)
+
+
+def _key(backend: str, query: str, cursor: Optional[str], limit: int) -> str:
+    digest = hashlib.sha1(
+        f"{query}\x00{cursor or ''}\x00{limit}".encode()
+    ).hexdigest()
+    return f"leaks:search:{_version()}:{backend}:{digest}"
+
+
+def get_cached_page(
+    backend: str, query: str, cursor: Optional[str], limit: int
+) -> tuple[str, Optional[LeakPage]]:
+    """Return the cache key of a search and its cached page, if any.
+
+    The key is ``None`` when the search cache is disabled.
+    """
+    if not settings.LEAK_SEARCH_CACHE_ENABLED:
+        return None, None
+    key = _key(backend, query, cursor, limit)
+    page = cache.get(key)
+    _count(HITS_KEY if page is not None else MISSES_KEY)
+    return key, page
+
+
+def store_page(key: Optional[str], page: LeakPage) -> None:
+    if key is not None:
+        cache.set(key, page, timeout=settings.LEAK_SEARCH_CACHE_TTL)
+
+
+def _count(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def search_cache_stats() -> dict:
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else 0.0,
+    }
@@ -0,0 +1,8 @@
+"""Custom signals emitted by the leaks app."""
+
+from django.dispatch import Signal
+
+# Sent by the post-ingest pipeline (``leaks.pipeline``) for new leaks,
+# whether saved one by one or with ``bulk_create``. ``leaks`` holds the
+# newly created ``Leak`` rows.
+leaks_created = Signal()
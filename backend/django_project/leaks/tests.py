@@ -1,11 +1,47 @@
+import csv
+import json
+from io import StringIO
+
 import pytest
+import redis
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from pymongo.results import BulkWriteResult
 from django.urls import reverse
 from rest_framework.test import APIClient
-from .models import Leak
+from django.utils import timezone
+from .models import Leak, LeakOutbox, LeakRollup
 from .serializers import LeakSerializer
 from sites.models import Site
 from accounts.models import PlatformUser, UserSearchQuota
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.conf import settings
+from django.db import connection
+from leaks import mongo_utils, pg_search, pipeline, search
 from leaks.documents import LeakDoc
+from leaks.indexes import check_indexes, ensure_indexes
+from leaks.search_cache import search_cache_stats
+from leaks.mongo_utils import (
+    COMPANY_COLLATION,
+    LEAK_PROJECTION,
+    find_leaks_by_site,
+    get_mongo_client,
+    reset_mongo_client,
+    insert_leaks,
+    search_leaks,
+)
+from leaks.pagination import (
+    InvalidCursor,
+    LeakPage,
+    decode_cursor,
+    encode_cursor,
+)
+from leaks.rollups import rebuild_rollups, record_leaks
+from leaks.signals import leaks_created
+from monitoring import signals as monitoring_signals
+from monitoring.models import MonitoredResource
 
 
 @pytest.mark.django_db
@@ -34,7 +70,51 @@ def test_leak_api_create_and_list():
     assert resp.status_code == 201
     resp = client.get(url)
     assert resp.status_code == 200
-    assert resp.data[0]["company"] == "X"
+    assert resp.data["results"][0]["company"] == "X"
+
+
+@pytest.mark.django_db
+def test_leak_list_filters_and_cursor_pages():
+    site = Site.objects.create(name="S", url="http://s.com")
+    for i, (company, country) in enumerate(
+        [("Acme", "BR"), ("Acme Labs", "BR"), ("Beta", "US"), ("Acme", "US")]
+    ):
+        leak = Leak.objects.create(
+            site=site if i < 3 else None,
+            company=company,
+            country=country,
+            source_url=f"http://x.com/{i}",
+        )
+        Leak.objects.filter(pk=leak.pk).update(
+            found_at=f"2025-01-0{i + 1}T12:00:00Z"
+        )
+    client = APIClient()
+    url = reverse("leak-list")
+
+    resp = client.get(
+        url, {"site": site.id, "company": "Acme", "country": "BR"}
+    )
+    assert [r["source_url"] for r in resp.data["results"]] == [
+        "http://x.com/1",
+        "http://x.com/0",
+    ]
+
+    resp = client.get(
+        url, {"found_after": "2025-01-02", "found_before": "2025-01-03"}
+    )
+    companies = [r["company"] for r in resp.data["results"]]
+    assert companies == ["Beta", "Acme Labs"]
+
+    resp = client.get(url, {"limit": 3})
+    assert len(resp.data["results"]) == 3
+    resp = client.get(resp.data["next"])
+    assert [r["source_url"] for r in resp.data["results"]] == [
+        "http://x.com/0"
+    ]
+    assert resp.data["next"] is None
+
+    assert client.get(url, {"site": "abc"}).status_code == 400
+    assert client.get(url, {"found_after": "yesterday"}).status_code == 400
 
 
 @pytest.mark.django_db
@@ -44,10 +124,16 @@ def test_leak_search_endpoint_deducts_quota(monkeypatch):
     )
     UserSearchQuota.objects.create(user=user, remaining=2)
 
-    def fake_search(query):
-        return [
-            LeakDoc(site_id=1, company="Acme", source_url="http://x.com")
-        ]
+    calls = []
+
+    def fake_search(query, cursor=None, limit=50):
+        calls.append((query, cursor, limit))
+        if cursor == "bad":
+            raise InvalidCursor("Malformed cursor")
+        if query == "boom":
+            raise RuntimeError("backend down")
+        hit = {"site_id": 1, "company": "Acme", "score": 1.5}
+        return LeakPage(results=[hit], next_cursor="next-page")
 
     monkeypatch.setattr("leaks.views.search_leaks", fake_search)
 
@@ -61,5 +147,884 @@ def test_leak_search_endpoint_deducts_quota(monkeypatch):
 
     assert resp.status_code == 200
     assert resp.data["results"][0]["company"] == "Acme"
+    assert resp.data["results"][0]["score"] == 1.5
+    assert resp.data["next"] == "next-page"
     quota = UserSearchQuota.objects.get(user=user)
     assert quota.remaining == 1
+
+    resp = client.get(
+        reverse("leak-search"), {"q": "acme", "cursor": "bad", "limit": 500}
+    )
+    assert resp.status_code == 400
+    assert calls[-1] == ("acme", "bad", 200)
+    assert UserSearchQuota.objects.get(user=user).remaining == 1
+
+    client.raise_request_exception = False
+    resp = client.get(reverse("leak-search"), {"q": "boom"})
+    assert resp.status_code == 500
+    assert UserSearchQuota.objects.get(user=user).remaining == 1
+
+    assert client.get(reverse("leak-search"), {"q": "a"}).status_code == 200
+    resp = client.get(reverse("leak-search"), {"q": "acme"})
+    assert resp.status_code == 403
+    assert UserSearchQuota.objects.get(user=user).remaining == 0
+
+
+@pytest.mark.django_db
+def test_leak_export_streams_ndjson_and_csv():
+    PlatformUser.objects.create_user(
+        username="joe", email="j@x.com", password="pass"
+    )
+    site = Site.objects.create(name="S", url="http://s.com")
+    other = Site.objects.create(name="O", url="http://o.com")
+    Leak.objects.create(
+        site=site,
+        company="Acme",
+        source_url="http://a.com",
+        download_links=["http://d.com/1"],
+    )
+    Leak.objects.create(
+        site=site, company="Beta", source_url="http://b.com", comment="acme"
+    )
+    Leak.objects.create(site=other, company="Acme", source_url="http://c.com")
+
+    client = APIClient()
+    url = reverse("leak-export")
+    assert client.get(url).status_code == 401
+    token = client.post(
+        reverse("login"), {"username": "joe", "password": "pass"}
+    ).data["access"]
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    resp = client.get(url, {"site": site.id})
+    assert resp.status_code == 200
+    assert resp["Content-Type"] == "application/x-ndjson"
+    rows = [
+        json.loads(line)
+        for line in b"".join(resp.streaming_content).splitlines()
+    ]
+    assert [row["source_url"] for row in rows] == [
+        "http://b.com",
+        "http://a.com",
+    ]
+    assert rows[1]["download_links"] == ["http://d.com/1"]
+
+    resp = client.get(url, {"output": "csv", "q": "ACME", "site": site.id})
+    assert resp["Content-Type"] == "text/csv"
+    lines = list(
+        csv.reader(b"".join(resp.streaming_content).decode().splitlines())
+    )
+    assert lines[0][:3] == ["id", "site_id", "company"]
+    assert [line[5] for line in lines[1:]] == ["http://b.com", "http://a.com"]
+    assert lines[2][11] == '["http://d.com/1"]'
+
+    assert client.get(url, {"output": "xml"}).status_code == 400
+
+    Leak.objects.create(
+        site=other,
+        company="=HYPERLINK(\"http://evil\")",
+        source_url="http://e.com",
+        information="-2+3",
+        comment="@SUM(A1)",
+        amount_of_data="10 GB",
+    )
+    resp = client.get(url, {"output": "csv", "site": other.id})
+    row = next(
+        line
+        for line in csv.reader(
+            b"".join(resp.streaming_content).decode().splitlines()
+        )
+        if line[5] == "http://e.com"
+    )
+    assert row[2] == "'=HYPERLINK(\"http://evil\")"
+    assert (row[9], row[10], row[8]) == ("'-2+3", "'@SUM(A1)", "10 GB")
+
+
+class FakeLeaksCollection:
+    def __init__(self):
+        self.docs = []
+        self.keys = set()
+
+    def bulk_write(self, requests, ordered=True):
+        self.docs.extend(requests)
+        upserted = []
+        for index, request in enumerate(requests):
+            key = (request._filter["company"], request._filter["source_url"])
+            if key not in self.keys:
+                self.keys.add(key)
+                upserted.append({"index": index, "_id": ObjectId()})
+        return BulkWriteResult(
+            {"nUpserted": len(upserted), "upserted": upserted}, True
+        )
+
+
+@pytest.mark.django_db
+def test_insert_leaks_bulk_counts_new_and_duplicates(monkeypatch):
+    coll = FakeLeaksCollection()
+    monkeypatch.setattr(
+        "leaks.mongo_utils.get_mongo_db",
+        lambda: type("DB", (), {"leaks": coll})(),
+    )
+    site = Site.objects.create(name="S", url="http://s.com")
+    Leak.objects.create(company="Old", source_url="http://old.com/")
+    received = []
+
+    def on_created(sender, leaks, **kwargs):
+        received.extend(leak.company for leak in leaks)
+
+    leaks_created.connect(on_created)
+    try:
+        result = insert_leaks(
+            [
+                LeakDoc(site_id=site.id, company="Old",
+                        source_url="http://old.com"),
+                LeakDoc(site_id=site.id, company="New",
+                        source_url="http://new.com"),
+                LeakDoc(site_id=site.id, company="New",
+                        source_url="http://new.com"),
+            ]
+        )
+    finally:
+        leaks_created.disconnect(on_created)
+
+    assert (result.inserted, result.duplicates) == (1, 2)
+    assert len(coll.docs) == 3
+    old_upsert = coll.docs[0]
+    assert isinstance(old_upsert, UpdateOne)
+    assert old_upsert._filter == {
+        "company": "Old",
+        "source_url": "http://old.com/",
+    }
+    assert old_upsert._doc["$setOnInsert"]["site_id"] == site.id
+    assert "last_seen_at" in old_upsert._doc["$set"]
+    assert old_upsert._upsert is True
+    assert Leak.objects.get(company="New").site == site
+    assert received == ["New"]
+
+
+@pytest.mark.django_db
+def test_insert_leaks_reports_only_its_own_upserts(monkeypatch):
+    coll = FakeLeaksCollection()
+    # Another worker upserted "Race" and writes its row to Postgres while
+    # this batch is between its existence check and bulk_create.
+    coll.keys.add(("Race", "http://race.com/"))
+    monkeypatch.setattr(
+        "leaks.mongo_utils.get_mongo_db",
+        lambda: type("DB", (), {"leaks": coll})(),
+    )
+    bulk_create = Leak.objects.bulk_create
+
+    def racing_bulk_create(objs, **kwargs):
+        bulk_create([Leak(company="Race", source_url="http://race.com/")])
+        return bulk_create(objs, **kwargs)
+
+    monkeypatch.setattr(Leak.objects, "bulk_create", racing_bulk_create)
+    site = Site.objects.create(name="S", url="http://s.com")
+    received = []
+
+    def on_created(sender, leaks, **kwargs):
+        received.extend(leak.company for leak in leaks)
+
+    leaks_created.connect(on_created)
+    try:
+        result = insert_leaks(
+            [
+                LeakDoc(
+                    site_id=site.id,
+                    company="Race",
+                    source_url="http://race.com",
+                ),
+                LeakDoc(
+                    site_id=site.id,
+                    company="Mine",
+                    source_url="http://mine.com",
+                ),
+            ]
+        )
+    finally:
+        leaks_created.disconnect(on_created)
+
+    assert (result.inserted, result.duplicates) == (1, 1)
+    assert received == ["Mine"]
+    assert Leak.objects.filter(company="Race").count() == 1
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def sort(self, *args):
+        self.calls.append(("sort", args))
+        return self
+
+    def limit(self, n):
+        self.calls.append(("limit", n))
+        return self
+
+    def __iter__(self):
+        return (dict(doc) for doc in self.docs)
+
+
+class FakeSearchCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.cursor = FakeCursor(docs)
+        self.queries = []
+        self.collations = []
+
+    def find(self, *args, collation=None, **kwargs):
+        self.queries.append(args)
+        self.collations.append(collation)
+        return self.cursor
+
+    def aggregate(self, pipeline, **kwargs):
+        self.queries.append(pipeline)
+        return (dict(doc) for doc in self.docs)
+
+
+def _leak_row(i, **extra):
+    return {
+        "_id": ObjectId(),
+        "site_id": 1,
+        "company": f"Acme {i}",
+        "source_url": f"http://x.com/{i}",
+        "found_at": f"2025-01-0{i}T00:00:00",
+        **extra,
+    }
+
+
+def _use_collection(monkeypatch, coll):
+    monkeypatch.setattr(
+        "leaks.mongo_utils.get_mongo_db",
+        lambda: type("DB", (), {"leaks": coll})(),
+    )
+
+
+def test_search_leaks_pages_text_results_by_score(monkeypatch):
+    rows = [_leak_row(i, score=3.0 - i) for i in (1, 2, 3)]
+    coll = FakeSearchCollection(rows)
+    _use_collection(monkeypatch, coll)
+
+    page = search_leaks("acme corp", limit=2)
+    assert [hit["score"] for hit in page.results] == [2.0, 1.0]
+    assert "_id" not in page.results[0]
+    assert page.results[0]["source_url"] == "http://x.com/1"
+    assert coll.queries[0][:4] == [
+        {"$match": {"$text": {"$search": "acme corp"}}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+        {"$sort": {"score": -1, "_id": -1}},
+        {"$limit": 3},
+    ]
+    assert coll.queries[0][4]["$project"]["score"] == 1
+    assert decode_cursor(page.next_cursor, "score") == (1.0, rows[1]["_id"])
+
+    search_leaks("acme corp", cursor=page.next_cursor, limit=2)
+    assert coll.queries[1][2] == {
+        "$match": {
+            "$or": [
+                {"score": {"$lt": 1.0}},
+                {"score": 1.0, "_id": {"$lt": rows[1]["_id"]}},
+            ]
+        }
+    }
+
+
+def test_search_leaks_prefix_fallback_and_cursor_checks(monkeypatch):
+    coll = FakeSearchCollection([_leak_row(1)])
+    _use_collection(monkeypatch, coll)
+
+    page = search_leaks("a.c")
+    assert page.next_cursor is None
+    assert coll.queries[0] == (
+        {"company": {"$gte": "a.c", "$lt": "a.c\uffff"}},
+        LEAK_PROJECTION,
+    )
+    assert coll.collations == [COMPANY_COLLATION]
+    assert coll.cursor.calls[0] == ("sort", ([("company", 1), ("_id", 1)],))
+
+    with pytest.raises(InvalidCursor):
+        search_leaks("a.c", cursor="not-a-cursor")
+    with pytest.raises(InvalidCursor):
+        search_leaks("a.c", cursor=encode_cursor("score", 1.0, ObjectId()))
+
+
+def test_find_leaks_by_site_uses_found_at_keyset(monkeypatch):
+    rows = [_leak_row(i) for i in (3, 2, 1)]
+    coll = FakeSearchCollection(rows)
+    _use_collection(monkeypatch, coll)
+
+    page = find_leaks_by_site(1, limit=2)
+    assert [leak["company"] for leak in page.results] == ["Acme 3", "Acme 2"]
+    assert coll.cursor.calls[:2] == [
+        ("sort", ([("found_at", -1), ("_id", -1)],)),
+        ("limit", 3),
+    ]
+
+    find_leaks_by_site(1, cursor=page.next_cursor, limit=2)
+    assert coll.queries[1] == (
+        {
+            "$and": [
+                {"site_id": 1},
+                {
+                    "$or": [
+                        {"found_at": {"$lt": rows[1]["found_at"]}},
+                        {
+                            "found_at": rows[1]["found_at"],
+                            "_id": {"$lt": rows[1]["_id"]},
+                        },
+                    ]
+                },
+            ]
+        },
+        LEAK_PROJECTION,
+    )
+
+
+class FakeIndexedCollection:
+    def __init__(self, docs, indexes):
+        self.docs = docs
+        self.indexes = indexes
+
+    def index_information(self):
+        return dict(self.indexes)
+
+    def create_indexes(self, models):
+        for model in models:
+            spec = model.document
+            keys = [(d["company"], d["source_url"]) for d in self.docs]
+            if spec.get("unique") and len(keys) != len(set(keys)):
+                raise OperationFailure("E11000 duplicate key", code=11000)
+            self.indexes[spec["name"]] = {
+                "key": list(spec["key"].items()),
+                "collation": {**spec.get("collation", {}), "version": "57"},
+            }
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        if pipeline == [{"$indexStats": {}}]:
+            return [
+                {"name": name, "accesses": {"ops": 0 if name == "old" else 5}}
+                for name in self.indexes
+            ]
+        groups = {}
+        for doc in sorted(self.docs, key=lambda d: d["_id"]):
+            key = (doc["company"], doc["source_url"])
+            groups.setdefault(key, []).append(doc["_id"])
+        return [
+            {"ids": ids, "count": len(ids)}
+            for ids in groups.values()
+            if len(ids) > 1
+        ]
+
+    def delete_many(self, query):
+        ids = set(query["_id"]["$in"])
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if d["_id"] not in ids]
+        return type("Result", (), {"deleted_count": before - len(self.docs)})
+
+
+def test_ensure_indexes_creates_missing_and_reports(monkeypatch):
+    ids = [ObjectId() for _ in range(4)]
+    coll = FakeIndexedCollection(
+        [
+            {"_id": ids[0], "company": "A", "source_url": "http://a/"},
+            {"_id": ids[1], "company": "A", "source_url": "http://a/"},
+            {"_id": ids[2], "company": "B", "source_url": "http://b/"},
+            {"_id": ids[3], "company": "A", "source_url": "http://a/"},
+        ],
+        {
+            "_id_": {"key": [("_id", 1)]},
+            "old": {"key": [("site_id", 1)]},
+            "legacy_text": {
+                "key": [("_fts", "text"), ("_ftsx", 1)],
+                "weights": {"company": 1, "information": 1, "comment": 1},
+            },
+        },
+    )
+    _use_collection(monkeypatch, coll)
+
+    report = check_indexes()
+    assert report.missing == [
+        "site_found_at_idx",
+        "found_at_idx",
+        "company_source_url_uniq",
+        "company_prefix_idx",
+    ]
+    assert report.undeclared == ["old"]
+
+    report = ensure_indexes()
+    assert report.created == [
+        "site_found_at_idx",
+        "found_at_idx",
+        "company_prefix_idx",
+    ]
+    assert report.blocked == ["company_source_url_uniq"]
+    assert report.missing == ["company_source_url_uniq"]
+    assert len(coll.docs) == 4
+    with pytest.raises(CommandError, match="company_source_url_uniq"):
+        call_command("ensure_mongo_indexes", stdout=StringIO())
+    err = StringIO()
+    call_command(
+        "ensure_mongo_indexes",
+        "--allow-blocked",
+        stdout=StringIO(),
+        stderr=err,
+    )
+    assert "remove_duplicate_leaks" in err.getvalue()
+    assert len(coll.docs) == 4
+
+    call_command("remove_duplicate_leaks", stdout=StringIO())
+    report = ensure_indexes()
+    assert report.created == ["company_source_url_uniq"]
+    assert report.blocked == []
+    assert [d["_id"] for d in coll.docs] == [ids[0], ids[2]]
+
+    report = check_indexes()
+    assert (report.missing, report.undeclared) == ([], ["old"])
+    assert report.unused == ["old"]
+    coll.indexes["found_at_idx"] = coll.indexes.pop("old")
+    assert check_indexes().conflicting == ["found_at_idx"]
+
+
+def test_remove_duplicate_leaks_command(monkeypatch):
+    ids = [ObjectId() for _ in range(3)]
+    coll = FakeIndexedCollection(
+        [
+            {"_id": ids[0], "company": "A", "source_url": "http://a/"},
+            {"_id": ids[1], "company": "A", "source_url": "http://a/"},
+            {"_id": ids[2], "company": "B", "source_url": "http://b/"},
+        ],
+        {},
+    )
+    _use_collection(monkeypatch, coll)
+    out = StringIO()
+
+    call_command("remove_duplicate_leaks", "--dry-run", stdout=out)
+    assert "1 leaks duplicados encontrados" in out.getvalue()
+    assert len(coll.docs) == 3
+
+    call_command("remove_duplicate_leaks", stdout=out)
+    assert "1 leaks duplicados removidos" in out.getvalue()
+    assert [d["_id"] for d in coll.docs] == [ids[0], ids[2]]
+
+
+def test_mongo_client_is_lazy_and_fork_safe(monkeypatch, settings):
+    settings.MONGODB_MAX_POOL_SIZE = 7
+    created = []
+
+    class FakeClient:
+        def __init__(self, uri, **options):
+            self.options = options
+            created.append(self)
+
+    monkeypatch.setattr("leaks.mongo_utils.MongoClient", FakeClient)
+    monkeypatch.setattr("leaks.mongo_utils._client", None)
+    assert created == []
+
+    client = get_mongo_client()
+    assert get_mongo_client() is client
+    assert client.options["maxPoolSize"] == 7
+    assert client.options["connect"] is False
+
+    child_pid = mongo_utils._client_pid + 1
+    monkeypatch.setattr("leaks.mongo_utils.os.getpid", lambda: child_pid)
+    child_client = get_mongo_client()
+    assert child_client is not client
+    assert get_mongo_client() is child_client
+
+    reset_mongo_client()
+    assert get_mongo_client() is not child_client
+    assert len(created) == 3
+    reset_mongo_client()
+
+
+@pytest.mark.django_db
+def test_search_cache_is_invalidated_by_ingest(
+    monkeypatch, settings, django_capture_on_commit_callbacks
+):
+    settings.LEAK_SEARCH_CACHE_ENABLED = True
+    coll = FakeSearchCollection([_leak_row(1, score=1.0)])
+    coll.bulk_write = FakeLeaksCollection().bulk_write
+    _use_collection(monkeypatch, coll)
+
+    first = search.search_leaks("Acme  Corp")
+    assert search.search_leaks("acme corp") == first
+    assert len(coll.queries) == 1
+    assert search_cache_stats()["hits"] == 1
+
+    site = Site.objects.create(name="S", url="http://s.com")
+    with django_capture_on_commit_callbacks(execute=True):
+        insert_leaks(
+            [
+                LeakDoc(
+                    site_id=site.id, company="Acme", source_url="http://a.com"
+                )
+            ]
+        )
+        # Until the new rows commit, the cached pages stay valid.
+        search.search_leaks("acme corp")
+        assert len(coll.queries) == 1
+    search.search_leaks("acme corp")
+    assert len(coll.queries) == 2
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Leak.objects.create(company="Acme 2", source_url="http://b.com")
+    search.search_leaks("acme corp")
+    assert len(coll.queries) == 3
+    assert search_cache_stats() == {
+        "hits": 2,
+        "misses": 3,
+        "hit_ratio": 2 / 5,
+    }
+
+
+@pytest.mark.django_db
+def test_search_cache_is_off_without_shared_cache(monkeypatch, settings):
+    settings.LEAK_SEARCH_CACHE_ENABLED = False
+    coll = FakeSearchCollection([_leak_row(1, score=1.0)])
+    _use_collection(monkeypatch, coll)
+
+    search.search_leaks("acme corp")
+    search.search_leaks("acme corp")
+    assert len(coll.queries) == 2
+    assert search_cache_stats()["misses"] == 0
+
+
+@pytest.mark.django_db
+def test_search_dispatches_to_configured_backend(monkeypatch, settings):
+    settings.LEAK_SEARCH_CACHE_ENABLED = True
+    calls = []
+
+    def fake_backend(query, cursor=None, limit=50):
+        calls.append((query, cursor, limit))
+        return LeakPage(results=[{"company": "Acme"}])
+
+    monkeypatch.setattr("leaks.pg_search.search_leaks", fake_backend)
+    settings.LEAK_SEARCH_BACKEND = "postgres"
+    page = search.search_leaks("  ACME ", limit=5)
+    assert page.results == [{"company": "Acme"}]
+    assert search.search_leaks("acme", limit=5) == page
+    assert calls == [("acme", None, 5)]
+
+    with pytest.raises(ImproperlyConfigured):
+        search.search_leaks("acme", backend="elastic")
+
+
+@pytest.mark.django_db
+def test_pg_search_prefix_pages_by_company():
+    site = Site.objects.create(name="S", url="http://s.com")
+    for company in ("Acme B", "Acme A", "Acme C", "Other"):
+        Leak.objects.create(
+            site=site, company=company, source_url="http://a.com"
+        )
+
+    page = pg_search.search_leaks("acm", limit=2)
+    assert [row["company"] for row in page.results] == ["Acme A", "Acme B"]
+    assert page.results[0]["site_id"] == site.id
+    assert "id" not in page.results[0]
+    page = pg_search.search_leaks("acm", cursor=page.next_cursor, limit=2)
+    assert [row["company"] for row in page.results] == ["Acme C"]
+    assert page.next_cursor is None
+
+    with pytest.raises(InvalidCursor):
+        pg_search.search_leaks(
+            "acm", cursor=encode_cursor("score", 1.0, 1), limit=2
+        )
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="requires PostgreSQL"
+)
+def test_pg_search_pages_through_rank_ties():
+    urls = {f"http://a.com/{n}" for n in range(5)}
+    for url in urls:
+        Leak.objects.create(company="Acme", source_url=url)
+    Leak.objects.create(
+        company="Other", source_url="http://o.com", information="acme"
+    )
+
+    seen, cursor = [], None
+    while True:
+        page = pg_search.search_leaks("acme", cursor=cursor, limit=1)
+        seen.extend(row["source_url"] for row in page.results)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert sorted(seen[:5]) == sorted(urls)
+    assert seen[5:] == ["http://o.com"]
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="requires PostgreSQL"
+)
+def test_pg_search_ranks_company_matches_first():
+    Leak.objects.create(
+        company="Other", source_url="http://o.com", information="acme dump"
+    )
+    Leak.objects.create(company="Acme Corp", source_url="http://a.com")
+    Leak.objects.create(company="Unrelated", source_url="http://u.com")
+
+    page = pg_search.search_leaks("acme", limit=1)
+    assert [row["company"] for row in page.results] == ["Acme Corp"]
+    page = pg_search.search_leaks("acme", cursor=page.next_cursor, limit=1)
+    assert [row["company"] for row in page.results] == ["Other"]
+    assert page.next_cursor is None
+
+
+class FakeStreamPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def xadd(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+    def execute(self):
+        if self.client.down:
+            raise redis.ConnectionError("redis down")
+        return [self.client.xadd(*a, **kw) for a, kw in self.calls]
+
+
+class FakeStreamRedis:
+    """Just enough of a Redis stream with one consumer group."""
+
+    def __init__(self):
+        self.entries = []
+        self.delivered = 0
+        self.pending = {}
+        self.deliveries = {}
+        self.dead = []
+        self.down = False
+
+    def xadd(self, name, fields, maxlen=None, approximate=True):
+        if name == settings.LEAK_PIPELINE_DEAD_LETTER_STREAM:
+            self.dead.append(fields)
+            return f"{len(self.dead)}-0"
+        entry_id = f"{len(self.entries) + 1}-0"
+        encoded = {k.encode(): v.encode() for k, v in fields.items()}
+        self.entries.append((entry_id, encoded))
+        return entry_id
+
+    def pipeline(self, transaction=True):
+        return FakeStreamPipeline(self)
+
+    def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        pass
+
+    def xautoclaim(self, name, groupname, consumername, **kwargs):
+        claimed = [e for e in self.entries if e[0] in self.pending]
+        for entry_id, _ in claimed:
+            self.deliveries[entry_id] += 1
+        return ["0-0", claimed, []]
+
+    def xpending_range(self, name, groupname, min, max, count, idle=None):
+        return [
+            {"message_id": key, "times_delivered": self.deliveries[key]}
+            for key in list(self.pending)[:count]
+        ]
+
+    def xrange(self, name, min="-", max="+"):
+        return [e for e in self.entries if min <= e[0] <= max]
+
+    def xreadgroup(self, groupname, consumername, streams, count=None):
+        end = self.delivered + count
+        new = self.entries[self.delivered:end]
+        self.delivered += len(new)
+        for entry_id, _ in new:
+            self.pending[entry_id] = consumername
+            self.deliveries[entry_id] = 1
+        return [[b"leaks:created", new]] if new else []
+
+    def xack(self, name, groupname, *ids):
+        for entry_id in ids:
+            self.pending.pop(entry_id, None)
+        return len(ids)
+
+
+@pytest.mark.django_db
+def test_pipeline_defers_receivers_until_consumed(monkeypatch, settings):
+    settings.LEAK_PIPELINE_BACKEND = "redis"
+    stream = FakeStreamRedis()
+    monkeypatch.setattr("leaks.pipeline.get_pipeline_redis", lambda: stream)
+    received = []
+    failures = ["Broken"]
+
+    def receiver(sender, leaks, **kwargs):
+        if any(leak.company in failures for leak in leaks):
+            failures.clear()
+            raise RuntimeError("receiver failed")
+        received.append([leak.company for leak in leaks])
+
+    leaks_created.connect(receiver)
+    try:
+        Leak.objects.create(company="Acme", source_url="http://a.com")
+        Leak.objects.create(company="Broken", source_url="http://b.com")
+        assert LeakOutbox.objects.count() == 2
+        assert pipeline.relay_outbox() == 2
+        assert LeakOutbox.objects.count() == 0
+        assert len(stream.entries) == 2
+        assert received == []
+
+        assert pipeline.consume_leaks() == 1
+        assert received == [["Acme"]]
+        assert list(stream.pending) == ["2-0"]
+
+        # The failed entry is still pending and is reclaimed next run.
+        assert pipeline.consume_leaks() == 1
+        assert received == [["Acme"], ["Broken"]]
+        assert stream.pending == {}
+    finally:
+        leaks_created.disconnect(receiver)
+
+
+@pytest.mark.django_db
+def test_pipeline_retries_are_idempotent_and_dead_lettered(
+    monkeypatch, settings
+):
+    settings.LEAK_PIPELINE_BACKEND = "redis"
+    settings.LEAK_PIPELINE_MAX_DELIVERIES = 3
+    stream = FakeStreamRedis()
+    monkeypatch.setattr("leaks.pipeline.get_pipeline_redis", lambda: stream)
+    monkeypatch.setattr(
+        "monitoring.services.send_alert_email",
+        lambda *args: emails.append(args),
+    )
+    emails = []
+    user = PlatformUser.objects.create_user(
+        username="u", email="u@x.com", password="p"
+    )
+    MonitoredResource.objects.create(user=user, keyword="acme")
+    # Rollups run first; alert matching then fails once.
+    check = monitoring_signals.check_leaks_against_resources
+    failures = [RuntimeError("smtp down")]
+
+    def flaky_check(leaks):
+        check(leaks)
+        if failures:
+            raise failures.pop()
+
+    monkeypatch.setattr(
+        "monitoring.signals.check_leaks_against_resources", flaky_check
+    )
+    Leak.objects.create(company="Acme", source_url="http://a.com")
+    pipeline.relay_outbox()
+
+    assert pipeline.consume_leaks() == 0
+    assert pipeline.consume_leaks() == 1
+    assert LeakRollup.objects.get().count == 1
+    assert len(emails) == 1
+
+    # An entry that keeps failing is parked instead of retried forever.
+    failures.extend(RuntimeError("boom") for _ in range(10))
+    Leak.objects.create(company="Acme 2", source_url="http://b.com")
+    pipeline.relay_outbox()
+    for _ in range(3):
+        assert pipeline.consume_leaks() == 0
+    assert list(stream.pending) == ["2-0"]
+    assert pipeline.consume_leaks() == 0
+    assert list(stream.pending) == []
+    assert stream.dead[0]["entry_id"] == "2-0"
+    assert stream.dead[0]["deliveries"] == 3
+    assert LeakRollup.objects.get().count == 2
+
+
+@pytest.mark.django_db
+def test_pipeline_outbox_survives_redis_outage(monkeypatch, settings):
+    settings.LEAK_PIPELINE_BACKEND = "redis"
+    stream = FakeStreamRedis()
+    stream.down = True
+    monkeypatch.setattr("leaks.pipeline.get_pipeline_redis", lambda: stream)
+    _use_collection(monkeypatch, FakeLeaksCollection())
+    site = Site.objects.create(name="S", url="http://s.com")
+
+    # Ingestion never talks to Redis, so an outage cannot fail it.
+    insert_leaks(
+        [LeakDoc(site_id=site.id, company="Acme", source_url="http://a.com")]
+    )
+    leak = Leak.objects.get(company="Acme")
+    with pytest.raises(redis.ConnectionError):
+        pipeline.relay_outbox()
+    assert list(LeakOutbox.objects.values_list("leak_ids", flat=True)) == [
+        [leak.pk]
+    ]
+
+    stream.down = False
+    assert pipeline.relay_outbox() == 1
+    assert not LeakOutbox.objects.exists()
+    assert stream.entries[0][1] == {b"ids": str(leak.pk).encode()}
+
+
+@pytest.mark.django_db
+def test_rollups_track_ingest_and_serve_dashboard():
+    PlatformUser.objects.create_user(
+        username="joe", email="j@x.com", password="pass"
+    )
+    forum = Site.objects.create(name="F", url="http://f.com", type="forum")
+    paste = Site.objects.create(name="P", url="http://p.com", type="paste")
+    for n, (site, country) in enumerate(
+        [(forum, "BR"), (forum, "BR"), (forum, None), (paste, "BR")]
+    ):
+        Leak.objects.create(
+            site=site,
+            company=f"C{n}",
+            source_url=f"http://l.com/{n}",
+            country=country,
+        )
+
+    today = timezone.localdate()
+    buckets = {
+        (r.site_id, r.country, r.source_type): r.count
+        for r in LeakRollup.objects.filter(day=today)
+    }
+    assert buckets == {
+        (forum.id, "BR", "forum"): 2,
+        (forum.id, "", "forum"): 1,
+        (paste.id, "BR", "paste"): 1,
+    }
+    # Still queued for the pipeline: record_leaks will count it later.
+    Leak.objects.bulk_create(
+        [Leak(site=paste, company="C4", source_url="http://l.com/4")]
+    )
+    assert rebuild_rollups() == 3
+    rebuilt = {
+        (r.site_id, r.country, r.source_type): r.count
+        for r in LeakRollup.objects.all()
+    }
+    assert rebuilt == buckets
+
+    client = APIClient()
+    url = reverse("leak-rollups")
+    assert client.get(url).status_code == 401
+    token = client.post(
+        reverse("login"), {"username": "joe", "password": "pass"}
+    ).data["access"]
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    resp = client.get(url, {"group_by": "source_type", "country": "BR"})
+    assert resp.status_code == 200
+    assert resp.data["results"] == [
+        {"day": today, "source_type": "forum", "count": 2},
+        {"day": today, "source_type": "paste", "count": 1},
+    ]
+    resp = client.get(url, {"group_by": "", "site": forum.id})
+    assert resp.data["results"] == [{"day": today, "count": 3}]
+
+    assert client.get(url, {"group_by": "company"}).status_code == 400
+    assert client.get(url, {"start": "2020-01-01"}).status_code == 400
+    assert client.get(url, {"end": "yesterday"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_rollup_bucket_without_site_stays_one_row():
+    leaks = [
+        Leak.objects.create(company=f"C{n}", source_url=f"http://l.com/{n}")
+        for n in range(3)
+    ]
+    record_leaks(leaks)
+
+    rows = LeakRollup.objects.filter(site=None)
+    assert [(r.country, r.source_type, r.count) for r in rows] == [
+        ("", "", 3)
+    ]
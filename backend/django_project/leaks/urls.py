@@ -1,7 +1,14 @@
 from django.urls import path
-from .views import LeakListCreateView, LeakSearchView
+from .views import (
+    LeakExportView,
+    LeakListCreateView,
+    LeakRollupView,
+    LeakSearchView,
+)
 
 urlpatterns = [
     path("leaks/", LeakListCreateView.as_view(), name="leak-list"),
     path("leaks/search/", LeakSearchView.as_view(), name="leak-search"),
+    path("leaks/export/", LeakExportView.as_view(), name="leak-export"),
+    path("leaks/rollups/", LeakRollupView.as_view(), name="leak-rollups"),
 ]
@@ -1,21 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from accounts.authentication import JWTAuthentication
-from accounts.models import UserSearchQuota
+from accounts.quota import consume_search, refund_search
+from .export import EXPORT_FORMATS, export_rows
+from .filters import filter_leaks
 from .models import Leak
 from .serializers import LeakSerializer
-from .mongo_utils import search_leaks
+from .search import search_leaks
+from .pagination import InvalidCursor, LeakCursorPagination
+from .rollups import ROLLUP_DIMENSIONS, rollup_counts
+
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 200
+ROLLUP_DEFAULT_DAYS = 30
+ROLLUP_MAX_DAYS = 366
 
 
 class LeakListCreateView(generics.ListCreateAPIView):
     queryset = Leak.objects.all()
     serializer_class = LeakSerializer
+    pagination_class = LeakCursorPagination
+
+    def get_queryset(self):
+        return filter_leaks(super().get_queryset(), self.request.query_params)
 
 
 class LeakSearchView(APIView):
-    """Search leaks in MongoDB and decrement user quota."""
+    """Search leaks with the configured backend and decrement user quota."""
 
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -24,18 +43,109 @@ class LeakSearchView(APIView):
         query = request.query_params.get("q")
         if not query:
             return Response({"detail": "Missing query"}, status=400)
+        try:
+            limit = int(request.query_params.get("limit", SEARCH_PAGE_SIZE))
+        except ValueError:
+            return Response({"detail": "Invalid limit"}, status=400)
+        limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
 
-        quota, _ = UserSearchQuota.objects.get_or_create(user=request.user)
-        if quota.remaining <= 0:
+        if not consume_search(request.user):
             return Response({"detail": "Search quota exceeded"}, status=403)
 
-        docs = search_leaks(query)
-        quota.remaining -= 1
-        quota.save(update_fields=["remaining", "updated_at"])
-        data = [
-            doc.model_dump(mode="json")
-            if hasattr(doc, "model_dump")
-            else doc.dict()
-            for doc in docs
-        ]
-        return Response({"results": data}, status=status.HTTP_200_OK)
+        try:
+            page = search_leaks(
+                query, cursor=request.query_params.get("cursor"), limit=limit
+            )
+        except InvalidCursor:
+            refund_search(request.user)
+            return Response({"detail": "Invalid cursor"}, status=400)
+        except Exception:
+            refund_search(request.user)
+            raise
+        return Response(
+            {"results": page.results, "next": page.next_cursor},
+            status=status.HTTP_200_OK,
+        )
+
+
+class LeakExportView(APIView):
+    """Stream filtered leaks as NDJSON or CSV.
+
+    Accepts the filters of the leak list plus ``q``. The format is read
+    from ``output`` because DRF reserves ``format`` for renderer
+    selection.
+    """
+
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_FORMATS:
+            return Response({"detail": "Invalid output"}, status=400)
+        render, content_type = EXPORT_FORMATS[output]
+        # Exports are long sequential reads; keep them off the primary
+        # when a replica is configured.
+        leaks = Leak.objects.using(settings.LEAK_SEARCH_DATABASE)
+        rows = export_rows(filter_leaks(leaks, request.query_params))
+        response = StreamingHttpResponse(
+            render(rows), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="leaks.{output}"'
+        )
+        return response
+
+
+class LeakRollupView(APIView):
+    """Daily leak counts for dashboards, read from ``LeakRollup``.
+
+    ``start`` and ``end`` (ISO dates, inclusive) default to the last 30
+    days. ``group_by`` is a comma-separated subset of site, country and
+    source_type; ``site``, ``country`` and ``source_type`` filter the
+    buckets.
+    """
+
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request) -> Response:
+        params = request.query_params
+        today = timezone.localdate()
+        try:
+            end = self._date(params, "end") or today
+            start = self._date(params, "start") or (
+                end - timedelta(days=ROLLUP_DEFAULT_DAYS - 1)
+            )
+            filters = {}
+            if params.get("site"):
+                filters["site_id"] = int(params["site"])
+        except ValueError:
+            return Response({"detail": "Invalid filter"}, status=400)
+        if start > end or (end - start).days >= ROLLUP_MAX_DAYS:
+            return Response({"detail": "Invalid date range"}, status=400)
+
+        group_by = params.get("group_by")
+        dimensions = (
+            [name for name in group_by.split(",") if name]
+            if group_by is not None
+            else list(ROLLUP_DIMENSIONS)
+        )
+        if any(name not in ROLLUP_DIMENSIONS for name in dimensions):
+            return Response({"detail": "Invalid group_by"}, status=400)
+        for name in ("country", "source_type"):
+            if params.get(name):
+                filters[name] = params[name]
+
+        results = rollup_counts(start, end, dimensions, **filters)
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _date(params, name):
+        value = params.get(name)
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValueError(value)
+        return parsed
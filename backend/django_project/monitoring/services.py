@@ -1,3 +1,5 @@
+from typing import Iterable
+
 from django.db.models import Q
 from leaks.models import Leak
 from .models import MonitoredResource, Alert
@@ -37,10 +39,15 @@ def create_alert(user, resource: MonitoredResource, leak: Leak) -> Alert:
 
 
 def scan_existing_leaks(resource: MonitoredResource) -> int:
+    """Alert on stored leaks that already mention ``resource.keyword``.
+
+    ``trgm_icontains`` lets Postgres answer each field with its trigram
+    index and OR the bitmaps instead of scanning ``leaks_leak``.
+    """
     key = resource.keyword
     query = Q()
     for field in MATCH_FIELDS:
-        query |= Q(**{f"{field}__icontains": key})
+        query |= Q(**{f"{field}__trgm_icontains": key})
     leaks = Leak.objects.filter(query)
     count = 0
     for leak in leaks:
@@ -51,6 +58,13 @@ def scan_existing_leaks(resource: MonitoredResource) -> int:
 
 
 def check_leak_against_resources(leak: Leak) -> None:
-    for resource in MonitoredResource.objects.all():
-        if leak_matches_keyword(leak, resource.keyword):
-            create_alert(resource.user, resource, leak)
+    check_leaks_against_resources([leak])
+
+
+def check_leaks_against_resources(leaks: Iterable[Leak]) -> None:
+    """Alert on ``leaks`` loading the monitored resources only once."""
+    resources = list(MonitoredResource.objects.select_related("user"))
+    for leak in leaks:
+        for resource in resources:
+            if leak_matches_keyword(leak, resource.keyword):
+                create_alert(resource.user, resource, leak)
@@ -5,6 +5,7 @@ from leaks.models import Leak
 from rest_framework.test import APIClient
 
 from .models import Alert, MonitoredResource
+from .services import scan_existing_leaks
 
 
 @pytest.mark.django_db
@@ -149,3 +150,28 @@ def test_update_permission_denied():
     assert resp.status_code == 404
     delete_resp = client.delete(url)
     assert delete_resp.status_code == 404
+
+
+@pytest.mark.django_db
+def test_scan_existing_leaks_matches_any_field(monkeypatch):
+    monkeypatch.setattr(
+        "monitoring.services.send_alert_email", lambda *a, **k: None
+    )
+    user = PlatformUser.objects.create_user(
+        username="u", email="u@x.com", password="p"
+    )
+    hits = [
+        Leak.objects.create(company="ACME_corp", source_url="http://a.com"),
+        Leak.objects.create(
+            company="X", source_url="http://b.com", information="dump acme_c"
+        ),
+        Leak.objects.create(
+            company="Y", source_url="http://c.com", comment="Acme_Corp"
+        ),
+    ]
+    # "_" must match literally, not as a LIKE wildcard.
+    Leak.objects.create(company="acmeXcorp", source_url="http://d.com")
+    resource = MonitoredResource.objects.create(user=user, keyword="acme_c")
+
+    assert scan_existing_leaks(resource) == 3
+    assert {alert.leak for alert in Alert.objects.all()} == set(hits)
@@ -1,11 +1,10 @@
 # scrapers/akira_cli.py
 import re
-import asyncio
 from datetime import datetime, timezone
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
+from bs4 import SoupStrainer
 
 from .base import BaseScraper  # caminho absoluto
+from .browser_pool import get_browser_pool
 from .config import ScraperConfig
 
 CLI_CMD = "leaks"
@@ -14,25 +13,20 @@ MAGNET_RX = re.compile(r"magnet:\?xt=urn:btih:[^\s]+", re.I)
 
 class AkiraCLIScraper(BaseScraper):
     slug = "akira_cli"
+    PARSER = "lxml"
+    PARSE_ONLY = SoupStrainer("table")
 
     async def _fetch_html(self, url: str) -> str:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            context = await browser.new_context(
-                proxy={"server": self.TOR_PROXY}
-            )
-            page = await context.new_page()
-
+        pool = get_browser_pool()
+        async with pool.page(proxy=self.TOR_PROXY) as page:
             await page.goto(url, wait_until="domcontentloaded")
             await page.keyboard.type(CLI_CMD)
             await page.keyboard.press("Enter")
             await page.wait_for_selector("pre, table", timeout=30_000)
-            html = await page.content()
-            await browser.close()
-            return html
+            return await page.content()
 
     def parse(self, html: str) -> list[dict]:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = self.make_soup(html)
         rows = soup.select("table tr")[1:]
         leaks: list[dict] = []
         for tr in rows:
@@ -54,5 +48,5 @@ class AkiraCLIScraper(BaseScraper):
         return leaks
 
     def run(self, config: ScraperConfig) -> list[dict]:
-        html = asyncio.run(self._fetch_html(config.url))
+        html = get_browser_pool().run(self._fetch_html(config.url))
         return self.parse(html)
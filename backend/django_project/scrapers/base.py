@@ -1,17 +1,23 @@
 from __future__ import annotations
 import abc
+import functools
+import hashlib
 import logging
 import random
+import threading
 import time
-from typing import Dict, List, Dict as DictType, Optional
+from typing import Any, Dict, Iterator, List, Dict as DictType, Optional
 
 import requests
+from bs4 import BeautifulSoup, SoupStrainer
 from requests import RequestException
-from playwright.async_api import async_playwright
 from django.conf import settings
 
-from utils.tor import renew_tor_circuit
-from .config import ScraperConfig
+from leaks.documents import LeakDoc
+from utils.tor import get_circuit_pool
+from .browser_pool import get_browser_pool
+from .config import BypassConfig, PageValidators, ScraperConfig
+from .session_pool import SessionKey, get_session_pool, new_session
 
 logger = logging.getLogger(__name__)
 
@@ -33,10 +39,51 @@ class BlockedByCaptcha(Exception):
     pass
 
 
+class NotModified(Exception):
+    """The page is unchanged since the validators in the config."""
+
+
+class RetryLater(Exception):
+    """The attempt failed and should be retried by a later task."""
+
+
+def fingerprint(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8", "replace")).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_parser(name: str) -> str:
+    """Return ``name`` if its parser is installed, else ``html.parser``."""
+    if name == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            logger.warning("lxml não instalado; usando html.parser")
+            return "html.parser"
+    return name
+
+
+def as_leak_doc(data: Any, site_id: int) -> LeakDoc:
+    """Return ``data`` as a ``LeakDoc``, defaulting its ``site_id``."""
+    if isinstance(data, LeakDoc):
+        return data
+    return LeakDoc(**{"site_id": site_id, **data})
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff for ``attempt`` (1-based) with equal jitter."""
+    delay = min(cap, base * 2 ** max(attempt - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
 class BaseScraper(abc.ABC):
     slug: str
     TOR_PROXY = settings.TOR_PROXY
     JS_WAIT_SELECTOR: Optional[str] = None
+    # Scrapers opt into a faster backend ("lxml") and, via PARSE_ONLY, into
+    # building only the part of the document their selectors need.
+    PARSER = "html.parser"
+    PARSE_ONLY: Optional[SoupStrainer] = None
 
     def __init_subclass__(cls) -> None:
         super().__init_subclass__()
@@ -47,33 +94,110 @@ class BaseScraper(abc.ABC):
             registry[slug] = cls()
             logger.debug("Scraper registrado: %s → %s", slug, cls.__name__)
 
-    def _build_session(self, config: ScraperConfig) -> requests.Session:
-        session = requests.Session()
-        if config.bypass_config is None:
-            config.bypass_config = BypassConfig(use_proxies=False, rotate_user_agent=False)
+    def _thread_state(self) -> threading.local:
+        # Registry instances are shared by every thread scraping a site,
+        # so per-run bookkeeping must not leak between threads.
+        state = self.__dict__.get("_state")
+        if state is None:
+            state = self.__dict__.setdefault("_state", threading.local())
+        return state
+
+    @property
+    def last_retries(self) -> int:
+        return getattr(self._thread_state(), "retries", 0)
+
+    @last_retries.setter
+    def last_retries(self, value: int) -> None:
+        self._thread_state().retries = value
+
+    @property
+    def last_validators(self) -> Optional[PageValidators]:
+        return getattr(self._thread_state(), "validators", None)
+
+    @last_validators.setter
+    def last_validators(self, value: Optional[PageValidators]) -> None:
+        self._thread_state().validators = value
+
+    def _conditional_headers(self, config: ScraperConfig) -> DictType:
+        headers = {}
+        if config.validators is not None:
+            if config.validators.etag:
+                headers["If-None-Match"] = config.validators.etag
+            if config.validators.last_modified:
+                headers["If-Modified-Since"] = (
+                    config.validators.last_modified
+                )
+        return headers
+
+    def _check_modified(
+        self,
+        config: ScraperConfig,
+        html: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> str:
+        """Record the page validators and stop if the content is unchanged.
 
-        ua = (
-            random.choice(USER_AGENTS)
-            if config.bypass_config.rotate_user_agent
-            else "BreachHawkBot/1.0"
+        Sites that ignore conditional requests are caught by comparing the
+        content hash with the one stored for the previous run.
+        """
+        validators = PageValidators(
+            etag=etag,
+            last_modified=last_modified,
+            content_hash=fingerprint(html),
         )
-        session.headers.update({"User-Agent": ua})
+        self.last_validators = validators
+        previous = config.validators
+        if previous and previous.content_hash == validators.content_hash:
+            raise NotModified(config.url)
+        return html
+
+    def _circuit_key(self, config: ScraperConfig) -> str:
+        return f"site-{config.site_id}"
+
+    def _http_proxy(self, config: ScraperConfig) -> Optional[str]:
         if config.url.endswith(".onion") or config.bypass_config.use_proxies:
-            proxy = self.TOR_PROXY.replace("socks5://", "socks5h://")
-            session.proxies.update({"http": proxy, "https": proxy})
-        return session
+            return get_circuit_pool(self.TOR_PROXY).proxy_for(
+                self._circuit_key(config)
+            )
+        return None
+
+    def _session_key(self, config: ScraperConfig) -> SessionKey:
+        if config.bypass_config is None:
+            config.bypass_config = BypassConfig(
+                use_proxies=False, rotate_user_agent=False
+            )
+        policy = (
+            "rotate" if config.bypass_config.rotate_user_agent else "fixed"
+        )
+        return (config.site_id, self._http_proxy(config), policy)
+
+    def _user_agent(self, config: ScraperConfig) -> str:
+        if config.bypass_config and config.bypass_config.rotate_user_agent:
+            return random.choice(USER_AGENTS)
+        return "BreachHawkBot/1.0"
+
+    def _build_session(self, config: ScraperConfig) -> requests.Session:
+        key = self._session_key(config)
+        return get_session_pool().get(
+            key,
+            lambda: new_session(
+                key[1], settings.SCRAPER_SESSION_CONNECTIONS
+            ),
+        )
+
+    def _headless_proxy(self, config: ScraperConfig) -> Optional[str]:
+        if (
+            config.url.endswith(".onion")
+            or config.bypass_config is not None
+            and config.bypass_config.use_proxies
+        ):
+            return self.TOR_PROXY
+        return None
 
     async def _fetch_headless(self, config: ScraperConfig) -> str:
-        async with async_playwright() as pw:
-            browser = await pw.chromium.launch(headless=True)
-            kwargs = {}
-            if (
-                config.url.endswith(".onion")
-                or config.bypass_config is not None and config.bypass_config.use_proxies
-            ):
-                kwargs["proxy"] = {"server": self.TOR_PROXY}
-            ctx = await browser.new_context(**kwargs)
-            page = await ctx.new_page()
+        pool = get_browser_pool()
+        async with pool.page(proxy=self._headless_proxy(config)) as page:
             await page.goto(
                 config.url,
                 timeout=config.execution_options.timeout_seconds * 1000,
@@ -91,56 +215,101 @@ class BaseScraper(abc.ABC):
                     logger.debug(
                         "Selector %s not found", self.JS_WAIT_SELECTOR
                     )
-            html = await page.content()
-            await browser.close()
-            return html
+            return await page.content()
 
     def fetch(self, config: ScraperConfig) -> str:
         last_exc: Optional[Exception] = None
+        self.last_validators = None
         if config.needs_js:
             try:
                 html = self._fetch_headless_sync(config)
                 self.last_retries = 0
-                return html
+                return self._check_modified(config, html)
+            except NotModified:
+                raise
             except Exception as exc:
                 last_exc = exc
                 self.last_retries = 0
                 raise last_exc
-        for attempt in range(config.tor.max_retries + 1):
+        # Deferred retries run a single attempt per task, so the worker
+        # never sleeps while the site backs off.
+        if config.tor.defer_retries:
+            attempts = range(config.attempt, config.attempt + 1)
+        else:
+            attempts = range(config.tor.max_retries + 1)
+        for attempt in attempts:
             if attempt:
                 try:
-                    renew_tor_circuit()
+                    get_circuit_pool(self.TOR_PROXY).renew(
+                        self._circuit_key(config)
+                    )
                 except Exception:
                     logger.exception("Erro ao renovar circuito TOR")
-                time.sleep(config.tor.retry_interval)
+                if not config.tor.defer_retries:
+                    time.sleep(
+                        backoff_delay(
+                            attempt,
+                            config.tor.retry_interval,
+                            settings.TOR_RETRY_BACKOFF_MAX,
+                        )
+                    )
+            session = self._build_session(config)
             try:
-                session = self._build_session(config)
                 resp = session.get(
                     config.url,
+                    headers={
+                        "User-Agent": self._user_agent(config),
+                        **self._conditional_headers(config),
+                    },
                     timeout=config.execution_options.timeout_seconds,
                 )
+                self.last_retries = attempt
+                if resp.status_code == 304:
+                    self.last_validators = config.validators
+                    raise NotModified(config.url)
                 resp.raise_for_status()
                 html = resp.text
                 if "<html" not in html.lower():
                     raise ValueError("invalid html")
-                self.last_retries = attempt
-                return html
+                return self._check_modified(
+                    config,
+                    html,
+                    etag=resp.headers.get("ETag"),
+                    last_modified=resp.headers.get("Last-Modified"),
+                )
             except requests.Timeout as exc:
                 last_exc = FetchTimeout(str(exc))
             except RequestException as exc:
                 last_exc = exc
+            # Don't retry over connections that just failed.
+            get_session_pool().discard(self._session_key(config))
+        if (
+            config.tor.defer_retries
+            and config.attempt < config.tor.max_retries
+        ):
+            self.last_retries = config.attempt
+            raise RetryLater(str(last_exc)) from last_exc
         try:
             html = self._fetch_headless_sync(config)
             self.last_retries = config.tor.max_retries + 1
-            return html
+            return self._check_modified(config, html)
+        except NotModified:
+            raise
         except Exception as exc:
             last_exc = exc
             self.last_retries = config.tor.max_retries + 1
         raise last_exc or RuntimeError("fetch failed")
 
     def _fetch_headless_sync(self, config: ScraperConfig) -> str:
-        import asyncio
-        return asyncio.run(self._fetch_headless(config))
+        return get_browser_pool().run(self._fetch_headless(config))
+
+    def make_soup(self, html: str, strain: bool = True) -> BeautifulSoup:
+        """Parse ``html`` with the scraper's parser and ``PARSE_ONLY``."""
+        return BeautifulSoup(
+            html,
+            resolve_parser(self.PARSER),
+            parse_only=self.PARSE_ONLY if strain else None,
+        )
 
     @abc.abstractmethod
     def parse(self, html: str) -> List[DictType]:
@@ -149,3 +318,12 @@ class BaseScraper(abc.ABC):
     def run(self, config: ScraperConfig) -> List[DictType]:
         html = self.fetch(config)
         return self.parse(html)
+
+    def iter_run(self, config: ScraperConfig) -> Iterator[LeakDoc]:
+        """Yield the leaks of ``config.url`` as they become available.
+
+        The default wraps :meth:`run`; crawlers that walk several pages
+        override it so results can be stored before the crawl finishes.
+        """
+        for data in self.run(config):
+            yield as_leak_doc(data, config.site_id)
@@ -0,0 +1,114 @@
+"""Offline parse benchmarks over recorded pages of registered scrapers."""
+
+from __future__ import annotations
+
+import math
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .base import BaseScraper, registry
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+@dataclass
+class BenchmarkResult:
+    """Parse throughput, memory and latency of one scraper."""
+
+    slug: str
+    pages: int
+    calls: int
+    items: int
+    items_per_sec: float
+    peak_memory_kb: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def fixture_pages(slug: str, fixtures_dir: Path = FIXTURES_DIR) -> List[str]:
+    """Return the recorded pages of ``slug``.
+
+    Pages live in ``<slug>.html`` or, for scrapers with several page
+    layouts, in ``<slug>/*.html``.
+    """
+    paths = [fixtures_dir / f"{slug}.html"]
+    paths += sorted((fixtures_dir / slug).glob("*.html"))
+    return [p.read_text(encoding="utf-8") for p in paths if p.is_file()]
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def benchmark_scraper(
+    slug: str, scraper: BaseScraper, pages: List[str], repeat: int = 20
+) -> BenchmarkResult:
+    """Time ``repeat`` passes of ``scraper.parse`` over ``pages``.
+
+    Memory is measured in a separate pass because tracemalloc slows
+    allocation-heavy parsers down and would skew the latencies.
+    """
+    for html in pages:  # warm up caches and lazy imports
+        scraper.parse(html)
+
+    latencies: List[float] = []
+    items = 0
+    for _ in range(repeat):
+        for html in pages:
+            start = time.perf_counter()
+            items += len(scraper.parse(html))
+            latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        for html in pages:
+            scraper.parse(html)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    elapsed = sum(latencies)
+    return BenchmarkResult(
+        slug=slug,
+        pages=len(pages),
+        calls=len(latencies),
+        items=items,
+        items_per_sec=items / elapsed if elapsed else 0.0,
+        peak_memory_kb=peak / 1024,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p95_ms=percentile(latencies, 95) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+    )
+
+
+def run_benchmarks(
+    slugs: Optional[Iterable[str]] = None,
+    repeat: int = 20,
+    fixtures_dir: Path = FIXTURES_DIR,
+) -> tuple[List[BenchmarkResult], List[str]]:
+    """Benchmark the registered scrapers that have recorded pages.
+
+    Returns the results and the slugs skipped for lack of fixtures.
+    """
+    results: List[BenchmarkResult] = []
+    skipped: List[str] = []
+    for slug in sorted(slugs or registry):
+        scraper = registry.get(slug)
+        pages = fixture_pages(slug, fixtures_dir) if scraper else []
+        if not pages:
+            skipped.append(slug)
+            continue
+        results.append(benchmark_scraper(slug, scraper, pages, repeat))
+    return results, skipped
@@ -0,0 +1,194 @@
+"""Worker-local pool of warm Playwright browsers."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterator,
+    Optional,
+    TypeVar,
+)
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class PooledBrowser:
+    browser: Any
+    pages_served: int = 0
+    broken: bool = False
+
+
+class BrowserPool:
+    """Keep Chromium processes alive between headless fetches.
+
+    The pool owns a dedicated event loop running in a daemon thread, so
+    synchronous callers (Celery tasks, scraper threads) share the same
+    browsers via :meth:`run`. Every lease gets a fresh browser context,
+    which keeps cookies and the proxy isolated per site, and browsers are
+    recycled after ``max_pages`` leases or as soon as they crash.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        max_pages: int,
+        launcher: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> None:
+        self.size = size
+        self.max_pages = max_pages
+        self._launcher = launcher or self._launch_chromium
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._idle: list[PooledBrowser] = []
+        self._playwright: Any = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever,
+                    name="browser-pool",
+                    daemon=True,
+                ).start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """Run ``coro`` on the pool loop and block until it finishes."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def iterate(self, agen: AsyncIterator[T]) -> Iterator[T]:
+        """Drive the async generator ``agen`` on the pool loop."""
+
+        async def step() -> tuple[bool, Optional[T]]:
+            try:
+                return True, await agen.__anext__()
+            except StopAsyncIteration:
+                return False, None
+
+        try:
+            while True:
+                more, item = self.run(step())
+                if not more:
+                    return
+                yield item
+        finally:
+            self.run(agen.aclose())
+
+    async def _launch_chromium(self) -> Any:
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+        return await self._playwright.chromium.launch(headless=True)
+
+    async def _acquire(self) -> PooledBrowser:
+        while self._idle:
+            pooled = self._idle.pop()
+            if pooled.browser.is_connected():
+                return pooled
+            await self._discard(pooled)
+        logger.debug("Iniciando novo navegador headless")
+        return PooledBrowser(await self._launcher())
+
+    async def _release(self, pooled: PooledBrowser) -> None:
+        pooled.pages_served += 1
+        if (
+            pooled.broken
+            or pooled.pages_served >= self.max_pages
+            or not pooled.browser.is_connected()
+        ):
+            await self._discard(pooled)
+        else:
+            self._idle.append(pooled)
+
+    async def _discard(self, pooled: PooledBrowser) -> None:
+        try:
+            await pooled.browser.close()
+        except Exception:
+            logger.debug("Erro ao fechar navegador descartado")
+
+    @asynccontextmanager
+    async def page(self, proxy: Optional[str] = None) -> AsyncIterator[Any]:
+        """Lease a page in a new context, optionally behind ``proxy``."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.size)
+        async with self._slots:
+            pooled = await self._acquire()
+            kwargs = {"proxy": {"server": proxy}} if proxy else {}
+            context = None
+            try:
+                context = await pooled.browser.new_context(**kwargs)
+                yield await context.new_page()
+            except Exception:
+                if not pooled.browser.is_connected():
+                    pooled.broken = True
+                raise
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pooled.broken = True
+                await self._release(pooled)
+
+    async def _close(self) -> None:
+        while self._idle:
+            await self._discard(self._idle.pop())
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self) -> None:
+        """Close idle browsers and stop the pool loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._slots = None
+
+
+_pool: Optional[BrowserPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the browser pool of the current process."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = BrowserPool(
+                size=settings.PLAYWRIGHT_POOL_SIZE,
+                max_pages=settings.PLAYWRIGHT_MAX_PAGES_PER_BROWSER,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def close_browser_pool() -> None:
+    """Shut down the pool of the current process, if any."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and _pool_pid == os.getpid():
+        pool.close()
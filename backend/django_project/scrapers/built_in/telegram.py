@@ -11,6 +11,7 @@ from telethon.tl.functions.channels import JoinChannelRequest
 
 from scrapers.base import BaseScraper
 from leaks.documents import LeakDoc
+from sites.cache import get_site
 from sites.models import Site, TelegramAccount, SiteMetrics
 
 logger = logging.getLogger(__name__)
@@ -153,7 +154,7 @@ class TelegramScraper(BaseScraper):
 
     def parse(self, config) -> List[Any]:
         logger.info(f"Parsing Telegram messages for site: {config.site_id}")
-        site = Site.objects.get(id=config.site_id)
+        site = get_site(config.site_id)
         account = self._get_telegram_account(site)
         client = self._init_client(account)
         logger.info(f"Initialized Telegram client for account: {account}")
@@ -21,6 +21,7 @@ class Credentials:
 class TorOptions:
     max_retries: int
     retry_interval: float
+    defer_retries: bool = False
 
 
 @dataclass
@@ -29,6 +30,15 @@ class ExecutionOptions:
     timeout_seconds: int
 
 
+@dataclass
+class PageValidators:
+    """Cache validators and content fingerprint of a fetched page."""
+
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+
 @dataclass
 class ScraperConfig:
     site_id: int
@@ -39,3 +49,5 @@ class ScraperConfig:
     tor: TorOptions
     execution_options: ExecutionOptions
     needs_js: bool = False
+    validators: Optional[PageValidators] = None
+    attempt: int = 0
@@ -0,0 +1,99 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scrapers.benchmark import FIXTURES_DIR, run_benchmarks
+
+# (field, header, format spec)
+COLUMNS = (
+    ("slug", "scraper", "<16"),
+    ("pages", "pages", ">6"),
+    ("items", "items", ">8"),
+    ("items_per_sec", "items/s", ">10.0f"),
+    ("peak_memory_kb", "peak KiB", ">9.0f"),
+    ("p50_ms", "p50 ms", ">8.2f"),
+    ("p95_ms", "p95 ms", ">8.2f"),
+    ("p99_ms", "p99 ms", ">8.2f"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the parse step of registered scrapers against recorded "
+        "HTML fixtures, without touching the network."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "slugs", nargs="*", help="Scrapers to run (default: all)."
+        )
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--fixtures-dir", type=Path, default=FIXTURES_DIR
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print results as JSON."
+        )
+        parser.add_argument(
+            "--baseline",
+            type=Path,
+            help="JSON output of a previous run to compare against.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed items/sec drop relative to the baseline.",
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+        results, skipped = run_benchmarks(
+            options["slugs"], options["repeat"], options["fixtures_dir"]
+        )
+
+        if options["json"]:
+            self.stdout.write(
+                json.dumps([r.as_dict() for r in results], indent=2)
+            )
+        else:
+            self.stdout.write(
+                " ".join(
+                    format(header, spec.split(".")[0])
+                    for _, header, spec in COLUMNS
+                )
+            )
+            for result in results:
+                row = result.as_dict()
+                self.stdout.write(
+                    " ".join(
+                        format(row[name], spec) for name, _, spec in COLUMNS
+                    )
+                )
+        for slug in skipped:
+            self.stderr.write(f"{slug}: sem fixtures, ignorado")
+
+        if options["baseline"]:
+            self._compare(results, options["baseline"], options["tolerance"])
+
+    def _compare(self, results, path, tolerance):
+        baseline = {
+            row["slug"]: row for row in json.loads(path.read_text())
+        }
+        regressions = []
+        for result in results:
+            previous = baseline.get(result.slug)
+            if not previous:
+                continue
+            floor = previous["items_per_sec"] * (1 - tolerance)
+            if result.items_per_sec < floor:
+                regressions.append(
+                    f"{result.slug}: {result.items_per_sec:.0f} items/s "
+                    f"(baseline {previous['items_per_sec']:.0f})"
+                )
+        if regressions:
+            raise CommandError(
+                "Regressão de desempenho:\n" + "\n".join(regressions)
+            )
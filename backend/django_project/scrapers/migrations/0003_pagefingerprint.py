@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scrapers", "0002_snapshot_screenshot"),
+        ("sites", "0005_site_frequency_minutes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PageFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("url", models.URLField()),
+                (
+                    "etag",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                (
+                    "last_modified",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(blank=True, max_length=64, null=True),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "site",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="sites.site",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("site", "url")},
+            },
+        ),
+    ]
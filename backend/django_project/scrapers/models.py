@@ -20,3 +20,20 @@ class Snapshot(models.Model):
 
     def __str__(self) -> str:  # pragma: no cover
         return f"Snapshot {self.id} for {self.site}"
+
+
+class PageFingerprint(models.Model):
+    """Validators of the last successfully ingested version of a page."""
+
+    site = models.ForeignKey("sites.Site", on_delete=models.CASCADE)
+    url = models.URLField()
+    etag = models.CharField(max_length=255, blank=True, null=True)
+    last_modified = models.CharField(max_length=255, blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("site", "url")
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.site} - {self.url}"
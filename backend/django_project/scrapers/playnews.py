@@ -1,130 +1,155 @@
-import asyncio
 import json
 import re
 from datetime import datetime, timezone
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright, Error as PwError
+from typing import AsyncIterator, Iterator, Optional
+from bs4 import SoupStrainer
+from playwright.async_api import Error as PwError
 
-from .base import BaseScraper
+from leaks.documents import LeakDoc
+from .base import BaseScraper, as_leak_doc
+from .browser_pool import get_browser_pool
+from .config import ScraperConfig
 
 TOPIC_RX = re.compile(r"viewtopic\('([^']+)'\)")
 
 
 class PlayNewsScraper(BaseScraper):
     slug = "playnews"
+    PARSER = "lxml"
+    PARSE_ONLY = SoupStrainer("th", class_="News")
 
     def scrape(self, site, db) -> list[dict]:
         """
         Retorna uma lista de dicts com os campos do LeakDoc.
         """
         try:
-            return asyncio.run(self._scrape(site, db))
+            return get_browser_pool().run(self._scrape(site, db))
         except PwError as e:
             if "ERR_SOCKS_CONNECTION_FAILED" in str(e):
                 return []
             raise
 
+    def run(self, config: ScraperConfig) -> list[LeakDoc]:
+        return list(self.iter_run(config))
+
+    def iter_run(self, config: ScraperConfig) -> Iterator[LeakDoc]:
+        """Yield leaks page by page while the crawl is still running."""
+        crawl = self._crawl(config.url, config.site_id)
+        for leak in get_browser_pool().iterate(crawl):
+            yield as_leak_doc(leak, config.site_id)
+
+    def parse(self, html: str) -> list[dict]:
+        """Parse the cards of a listing page, keyed by ``topic_id``."""
+        cards: list[dict] = []
+        for card in self.make_soup(html).select("th.News"):
+            m = TOPIC_RX.search(card.get("onclick", ""))
+            if not m:
+                continue
+
+            title = card.find(string=True, recursive=False).strip()
+            country = (
+                card.select_one("i.location").next_sibling.strip()
+                if card.select_one("i.location") else None
+            )
+            txt = card.get_text(" ", strip=True)
+            views = int(re.search(r"views:\s*(\d+)", txt).group(1))
+            added = datetime.fromisoformat(
+                re.search(
+                    r"added:\s*(\d{4}-\d{2}-\d{2})",
+                    txt,
+                ).group(1)
+            ).replace(tzinfo=timezone.utc)
+            pub_date = datetime.fromisoformat(
+                re.search(
+                    r"publication date:\s*(\d{4}-\d{2}-\d{2})",
+                    txt,
+                ).group(1)
+            ).replace(tzinfo=timezone.utc)
+
+            cards.append({
+                "topic_id":         m.group(1),
+                "company":          title,
+                "country":          country,
+                "found_at":         added,
+                "views":            views,
+                "publication_date": pub_date,
+            })
+        return cards
+
+    def parse_detail(self, html: str) -> dict:
+        """Extract the leak details from a topic page."""
+        detail_txt = self.make_soup(html, strain=False).get_text(
+            " ", strip=True
+        )
+
+        amt = re.search(
+            r"amount of data:\s*([^ ]+)",
+            detail_txt,
+            re.IGNORECASE,
+        )
+        info = re.search(
+            r"information:\s*(.+?)comment:",
+            detail_txt,
+            re.IGNORECASE | re.DOTALL,
+        )
+        comm = re.search(
+            r"comment:\s*(.+?)(?:DOWNLOAD LINKS:|$)",
+            detail_txt,
+            re.IGNORECASE | re.DOTALL
+        )
+        download_links = re.findall(
+            r"https?://[^\s]+\.onion/[^\s]+",
+            detail_txt,
+        )
+        rar = re.search(
+            r"Rar password:\s*([^\s]+)",
+            detail_txt,
+            re.IGNORECASE,
+        )
+        return {
+            "amount_of_data":   amt.group(1) if amt else None,
+            "information":      info.group(1).strip() if info else None,
+            "comment":          comm.group(1).strip() if comm else None,
+            "download_links":   json.dumps(download_links),
+            "rar_password":     rar.group(1) if rar else None,
+        }
+
     async def _scrape(self, site, db) -> list[dict]:
-        leaks: list[dict] = []
-        async with async_playwright() as pw:
-            browser = await pw.chromium.launch(headless=True)
-            ctx = await browser.new_context(proxy={"server": self.TOR_PROXY})
-            page = await ctx.new_page()
+        return [leak async for leak in self._crawl(site.url, site.id, db)]
+
+    async def _crawl(
+        self, url: str, site_id: int, db: Optional[object] = None
+    ) -> AsyncIterator[dict]:
+        pool = get_browser_pool()
+        async with pool.page(proxy=self.TOR_PROXY) as page:
             page.set_default_timeout(120_000)
 
             page_num = 1
             while True:
-                list_url = f"{site.url.rstrip('/')}/index.php?page={page_num}"
+                list_url = f"{url.rstrip('/')}/index.php?page={page_num}"
                 await page.goto(list_url, wait_until="networkidle")
-                await self._snapshot(page, site.id, db)
+                if db is not None:
+                    await self._snapshot(page, site_id, db)
 
-                soup = BeautifulSoup(await page.content(), "html.parser")
-                cards = soup.select("th.News")
+                cards = self.parse(await page.content())
                 if not cards:
                     break
 
                 for card in cards:
-                    m = TOPIC_RX.search(card.get("onclick", ""))
-                    if not m:
-                        continue
-                    tid = m.group(1)
-
-                    title = card.find(text=True, recursive=False).strip()
-                    country = (
-                        card.select_one("i.location").next_sibling.strip()
-                        if card.select_one("i.location") else None
-                    )
-                    txt = card.get_text(" ", strip=True)
-                    views = int(re.search(r"views:\s*(\d+)", txt).group(1))
-                    added = datetime.fromisoformat(
-                        re.search(
-                            r"added:\s*(\d{4}-\d{2}-\d{2})",
-                            txt,
-                        ).group(1)
-                    ).replace(tzinfo=timezone.utc)
-                    pub_date = datetime.fromisoformat(
-                        re.search(
-                            r"publication date:\s*(\d{4}-\d{2}-\d{2})",
-                            txt,
-                        ).group(1)
-                    ).replace(tzinfo=timezone.utc)
-
-                    detail_url = f"{site.url.rstrip('/')}/topic.php?id={tid}"
-                    await page.goto(detail_url, wait_until="networkidle")
-                    await self._snapshot(page, site.id, db, save_html=True)
-                    detail_txt = BeautifulSoup(
-                        await page.content(),
-                        "html.parser",
-                    ).get_text(" ", strip=True)
-
-                    amt = re.search(
-                        r"amount of data:\s*([^ ]+)",
-                        detail_txt,
-                        re.IGNORECASE,
-                    )
-                    amount_of_data = amt.group(1) if amt else None
-
-                    info = re.search(
-                        r"information:\s*(.+?)comment:",
-                        detail_txt,
-                        re.IGNORECASE | re.DOTALL,
-                    )
-                    information = info.group(1).strip() if info else None
-
-                    comm = re.search(
-                        r"comment:\s*(.+?)(?:DOWNLOAD LINKS:|$)",
-                        detail_txt,
-                        re.IGNORECASE | re.DOTALL
-                    )
-                    comment = comm.group(1).strip() if comm else None
-
-                    download_links = re.findall(
-                        r"https?://[^\s]+\.onion/[^\s]+",
-                        detail_txt,
-                    )
-                    rar = re.search(
-                        r"Rar password:\s*([^\s]+)",
-                        detail_txt,
-                        re.IGNORECASE,
-                    )
-                    rar_password = rar.group(1) if rar else None
-
-                    leaks.append({
-                        "site_id":          site.id,
-                        "company":          title,
-                        "country":          country,
-                        "found_at":         added,
+                    tid = card.pop("topic_id")
+                    detail_url = f"{url.rstrip('/')}/topic.php?id={tid}"
+                    await page.goto(detail_url, wait_until="networkidle")
+                    if db is not None:
+                        await self._snapshot(
+                            page, site_id, db, save_html=True
+                        )
+                    detail = self.parse_detail(await page.content())
+
+                    yield {
+                        "site_id":          site_id,
+                        **card,
                         "source_url":       detail_url,
-                        "views":            views,
-                        "publication_date": pub_date,
-                        "amount_of_data":   amount_of_data,
-                        "information":      information,
-                        "comment":          comment,
-                        "download_links":   json.dumps(download_links),
-                        "rar_password":     rar_password,
-                    })
+                        **detail,
+                    }
 
                 page_num += 1
-
-            await browser.close()
-        return leaks
@@ -3,7 +3,7 @@ import re
 from datetime import datetime, timezone
 from typing import List, Dict
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
+from bs4 import SoupStrainer
 
 from .config import ScraperConfig
 
@@ -15,6 +15,8 @@ DATE_RX = re.compile(r"(\d{2}/\d{2}/\d{4})")
 class RansomHouseScraper(BaseScraper):
     slug = "ransomhouse"
     JS_WAIT_SELECTOR = "div.cls_record"
+    PARSER = "lxml"
+    PARSE_ONLY = SoupStrainer("div", class_="cls_record")
 
     def run(self, config: ScraperConfig) -> List[Dict]:
         """Fetch page and return leaks with absolute URLs and site id."""
@@ -29,7 +31,7 @@ class RansomHouseScraper(BaseScraper):
         return leaks
 
     def parse(self, html: str) -> List[Dict]:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = self.make_soup(html)
         cards = soup.select("div.cls_record")
         leaks: List[Dict] = []
         for card in cards:
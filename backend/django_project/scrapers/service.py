@@ -1,21 +1,27 @@
 import logging
-from typing import Dict, Optional, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Union
 from uuid import UUID
 
 from django.conf import settings
+from django.db import connections
 
 from . import registry
+from .base import NotModified, RetryLater, as_leak_doc, backoff_delay
 from .config import (
     ScraperConfig,
     BypassConfig,
     Credentials,
     TorOptions,
     ExecutionOptions,
+    PageValidators,
 )
+from sites.cache import get_site
 from sites.models import Site, SiteMetrics
-from .models import ScrapeLog
+from .models import PageFingerprint, ScrapeLog
 from .built_in.telegram import TelegramScraper
-from leaks.mongo_utils import insert_leak
+from leaks.mongo_utils import insert_leaks
 from leaks.documents import LeakDoc
 from celery.result import AsyncResult
 from celery import states, current_app
@@ -24,7 +30,10 @@ from typing import Any
 logger = logging.getLogger(__name__)
 
 def _build_config(
-    site: Site, url: str, payload: Optional[Dict]
+    site: Site,
+    url: str,
+    payload: Optional[Dict],
+    validators: Optional[PageValidators] = None,
 ) -> ScraperConfig:
     bypass = site.bypass_config or {}
     creds = site.credentials or None
@@ -42,6 +51,7 @@ def _build_config(
     tor = TorOptions(
         max_retries=settings.TOR_MAX_RETRIES,
         retry_interval=settings.TOR_RETRY_INTERVAL,
+        defer_retries=settings.SCRAPER_DEFER_RETRIES,
     )
     exec_opts = ExecutionOptions(
         max_retries=settings.TOR_MAX_RETRIES,
@@ -56,11 +66,170 @@ def _build_config(
         tor=tor,
         execution_options=exec_opts,
         needs_js=site.needs_js,
+        validators=validators,
+        attempt=(payload or {}).get("attempt", 0),
     )
 
 
+def _load_validators(
+    site: Site, payload: Optional[Dict]
+) -> Dict[str, PageValidators]:
+    """Return the stored validators of each page, unless forced."""
+    if payload and payload.get("force"):
+        return {}
+    return {
+        fp.url: PageValidators(
+            etag=fp.etag,
+            last_modified=fp.last_modified,
+            content_hash=fp.content_hash,
+        )
+        for fp in PageFingerprint.objects.filter(site=site)
+    }
+
+
+def _store_validators(
+    site: Site, url: str, validators: PageValidators
+) -> None:
+    PageFingerprint.objects.update_or_create(
+        site=site,
+        url=url,
+        defaults={
+            "etag": validators.etag,
+            "last_modified": validators.last_modified,
+            "content_hash": validators.content_hash,
+        },
+    )
+
+
+@dataclass
+class UrlResult:
+    """Outcome of fetching and parsing a single site URL."""
+
+    url: str
+    inserted: int = 0
+    retries: int = 0
+    error: Optional[Exception] = None
+    validators: Optional[PageValidators] = None
+    not_modified: bool = False
+    retry: bool = False
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of up to ``size`` items.
+
+    If ``items`` fails midway, the items read so far are still yielded
+    and the error is raised on the following step, so leaks parsed
+    before a crash get inserted.
+    """
+    batch = []
+    try:
+        for item in items:
+            batch.append(item)
+            if len(batch) == size:
+                yield batch
+                batch = []
+    except Exception:
+        if batch:
+            yield batch
+        raise
+    if batch:
+        yield batch
+
+
+def _iter_leaks(scraper, config: ScraperConfig) -> Iterator[LeakDoc]:
+    iter_run = getattr(scraper, "iter_run", None)
+    if iter_run is not None:
+        return iter_run(config)
+    return (as_leak_doc(data, config.site_id) for data in scraper.run(config))
+
+
+def _scrape_url(
+    scraper,
+    site: Site,
+    url: str,
+    payload: Optional[Dict],
+    validators: Optional[PageValidators] = None,
+) -> UrlResult:
+    """Fetch ``url`` and insert its leaks in batches as they are parsed."""
+    config = _build_config(site, url, payload, validators)
+    inserted = 0
+    try:
+        leaks = _iter_leaks(scraper, config)
+        for batch in _batched(leaks, settings.LEAK_INSERT_BATCH_SIZE):
+            inserted += insert_leaks(batch).inserted
+    except NotModified:
+        logger.info("Página sem alterações: %s", url)
+        return UrlResult(
+            url=url,
+            retries=getattr(scraper, "last_retries", 0),
+            not_modified=True,
+        )
+    except RetryLater as exc:
+        logger.warning("Falha temporária em %s: %s", url, exc)
+        return UrlResult(
+            url=url,
+            inserted=inserted,
+            retries=getattr(scraper, "last_retries", 0),
+            error=exc,
+            retry=True,
+        )
+    except Exception as exc:
+        logger.exception("Scraper failure for %s", url)
+        return UrlResult(
+            url=url,
+            inserted=inserted,
+            retries=getattr(scraper, "last_retries", 0),
+            error=exc,
+        )
+    return UrlResult(
+        url=url,
+        inserted=inserted,
+        retries=getattr(scraper, "last_retries", 0),
+        validators=getattr(scraper, "last_validators", None),
+    )
+
+
+def _scrape_url_in_thread(*args) -> UrlResult:
+    try:
+        return _scrape_url(*args)
+    finally:
+        # Worker threads get their own DB connections; don't leak them.
+        connections.close_all()
+
+
+def _scrape_urls(
+    scraper, site: Site, urls: List[str], payload: Optional[Dict]
+) -> Iterator[UrlResult]:
+    """Yield one result per URL, fetching up to the concurrency cap."""
+    validators = _load_validators(site, payload)
+    workers = min(settings.SCRAPER_SITE_CONCURRENCY, len(urls))
+    if workers <= 1:
+        for url in urls:
+            yield _scrape_url(
+                scraper, site, url, payload, validators.get(url)
+            )
+        return
+
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix=f"scrape-site-{site.id}"
+    ) as executor:
+        futures = [
+            executor.submit(
+                _scrape_url_in_thread,
+                scraper,
+                site,
+                url,
+                payload,
+                validators.get(url),
+            )
+            for url in urls
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
 def run_scraper_for_site(site_id: int, payload: Optional[Dict] = None) -> int:
-    site = Site.objects.get(pk=site_id)
+    site = get_site(site_id)
     if not site.enabled:
         logger.info("Site %s está desabilitado", site.url)
         return 0
@@ -72,41 +241,97 @@ def run_scraper_for_site(site_id: int, payload: Optional[Dict] = None) -> int:
     scraper_slug = getattr(scraper, "slug", site.scraper)
     logger.info("Iniciando scraper %s para o site %s", scraper_slug, site.url)
     
-    urls = [link.url for link in site.links.all()] or [site.url]
+    urls = (payload or {}).get("urls") or [
+        link.url for link in site.links.all()
+    ] or [site.url]
     total_inserted = 0
-    for url in urls:
-        config = _build_config(site, url, payload)
-        try:
-            raw_leaks = scraper.run(config)
-        except Exception as exc:
+    retry_urls: List[str] = []
+    for result in _scrape_urls(scraper, site, urls, payload):
+        # Batches stored before a failure are kept.
+        total_inserted += result.inserted
+        if result.retry:
+            retry_urls.append(result.url)
+            SiteMetrics.objects.create(
+                site=site,
+                retries=result.retries,
+                permanent_fail=False,
+            )
+            ScrapeLog.objects.create(
+                site=site,
+                url=result.url,
+                success=False,
+                message=f"retry scheduled: {result.error}",
+            )
+            continue
+
+        if result.error is not None:
             SiteMetrics.objects.create(
                 site=site,
-                retries=getattr(scraper, "last_retries", 0),
+                retries=result.retries,
                 permanent_fail=True,
             )
             ScrapeLog.objects.create(
-                site=site, url=url, success=False, message=str(exc)
+                site=site,
+                url=result.url,
+                success=False,
+                message=str(result.error),
             )
-            logger.exception("Scraper failure for %s", url)
             continue
 
-        inserted = 0
-        for data in raw_leaks:
-            doc = data if isinstance(data, LeakDoc) else LeakDoc(**data)
-            insert_leak(doc)
-            inserted += 1
+        if result.not_modified:
+            SiteMetrics.objects.create(
+                site=site,
+                retries=result.retries,
+                permanent_fail=False,
+            )
+            ScrapeLog.objects.create(
+                site=site,
+                url=result.url,
+                success=True,
+                message="not modified",
+            )
+            continue
 
-        total_inserted += inserted
+        # Only remember the page once its leaks are safely stored.
+        if result.validators is not None:
+            _store_validators(site, result.url, result.validators)
         SiteMetrics.objects.create(
             site=site,
-            retries=getattr(scraper, "last_retries", 0),
+            retries=result.retries,
             permanent_fail=False,
         )
-        ScrapeLog.objects.create(site=site, url=url, success=True)
+        ScrapeLog.objects.create(site=site, url=result.url, success=True)
 
+    if retry_urls:
+        attempt = (payload or {}).get("attempt", 0) + 1
+        schedule_retry(site.id, retry_urls, attempt, payload)
     return total_inserted
 
 
+def schedule_retry(
+    site_id: int,
+    urls: List[str],
+    attempt: int,
+    payload: Optional[Dict] = None,
+) -> AsyncResult:
+    """Re-enqueue ``urls`` of a site after an exponential backoff."""
+    retry_payload = dict(payload or {})
+    retry_payload.update({"siteId": site_id, "urls": urls, "attempt": attempt})
+    countdown = backoff_delay(
+        attempt, settings.TOR_RETRY_INTERVAL, settings.TOR_RETRY_BACKOFF_MAX
+    )
+    logger.info(
+        "Reagendando %d URL(s) do site %s em %.1fs (tentativa %d)",
+        len(urls),
+        site_id,
+        countdown,
+        attempt,
+    )
+    return current_app.send_task(
+        "scrape_site", args=[retry_payload], countdown=countdown
+    )
+
+
 def schedule_scraper(site_id: int) -> AsyncResult:
     site = Site.objects.get(pk=site_id)
     if site.type == "telegram":
@@ -0,0 +1,117 @@
+"""Process-wide pool of keep-alive HTTP sessions for scrapers."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# (site id, proxy URL, user-agent policy)
+SessionKey = Tuple[int, Optional[str], str]
+
+
+@dataclass
+class PooledSession:
+    session: requests.Session
+    last_used: float
+
+
+def new_session(proxy: Optional[str], connections: int) -> requests.Session:
+    """Return a session with keep-alive pools sized for ``connections``."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=connections, pool_maxsize=connections
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if proxy:
+        session.proxies.update({"http": proxy, "https": proxy})
+    return session
+
+
+class SessionPool:
+    """LRU of sessions keyed by site, proxy and user-agent policy.
+
+    Reusing a session keeps its SOCKS/TLS connections alive between
+    requests and scrape runs. Sessions unused for ``idle_timeout``
+    seconds are closed, and the least recently used one is dropped once
+    ``max_size`` is exceeded.
+    """
+
+    def __init__(self, max_size: int, idle_timeout: float) -> None:
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._sessions: OrderedDict[SessionKey, PooledSession] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(
+        self, key: SessionKey, factory: Callable[[], requests.Session]
+    ) -> requests.Session:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            pooled = self._sessions.get(key)
+            if pooled is None:
+                pooled = PooledSession(factory(), now)
+                self._sessions[key] = pooled
+                while len(self._sessions) > self.max_size:
+                    _, oldest = self._sessions.popitem(last=False)
+                    oldest.session.close()
+            else:
+                self._sessions.move_to_end(key)
+                pooled.last_used = now
+            return pooled.session
+
+    def discard(self, key: SessionKey) -> None:
+        """Forget ``key`` so the next ``get`` opens fresh connections.
+
+        The session is not closed because other threads of the same
+        site may still be using it; it is released once unreferenced.
+        """
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            while self._sessions:
+                _, pooled = self._sessions.popitem()
+                pooled.session.close()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict_idle(self, now: float) -> None:
+        expired = [
+            key
+            for key, pooled in self._sessions.items()
+            if now - pooled.last_used > self.idle_timeout
+        ]
+        for key in expired:
+            self._sessions.pop(key).session.close()
+
+
+_pool: Optional[SessionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> SessionPool:
+    """Return the session pool of the current process."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = SessionPool(
+                max_size=settings.SCRAPER_SESSION_POOL_SIZE,
+                idle_timeout=settings.SCRAPER_SESSION_IDLE_SECONDS,
+            )
+            _pool_pid = os.getpid()
+        return _pool
@@ -1,13 +1,29 @@
+import json
+import threading
+from pathlib import Path
+
 import pytest
+import requests
+from pymongo.results import BulkWriteResult
+from django.core.management import CommandError, call_command
 from django.urls import reverse
-from .models import ScrapeLog, Snapshot
+from .models import PageFingerprint, ScrapeLog, Snapshot
 from .serializers import ScrapeLogSerializer, SnapshotSerializer
-from sites.models import Site
+from sites.models import Site, SiteLink, SiteMetrics
 from leaks.documents import LeakDoc
+from leaks.mongo_utils import BulkInsertResult
 from monitoring.models import Alert, MonitoredResource
 from scrapers import service
+from scrapers.base import BaseScraper, NotModified, RetryLater
+from scrapers.benchmark import percentile, run_benchmarks
+from scrapers.browser_pool import BrowserPool
+from scrapers.config import BypassConfig, ExecutionOptions, ScraperConfig
+from scrapers.config import PageValidators, TorOptions
+from scrapers.session_pool import SessionPool, get_session_pool
 from accounts.models import PlatformUser
 
+FIXTURES = Path(__file__).parent / "fixtures"
+
 
 @pytest.mark.django_db
 def test_scrapelog_model_str():
@@ -152,15 +168,20 @@ def test_run_scraper_produces_alert(monkeypatch):
     inserted = []
 
     class Coll:
-        def insert_one(self, data):
-            inserted.append(data)
-            return type("R", (), {"inserted_id": "1"})()
+        def bulk_write(self, requests, ordered=True):
+            inserted.extend(requests)
+            upserted = [
+                {"index": index, "_id": index}
+                for index in range(len(requests))
+            ]
+            return BulkWriteResult(
+                {"nUpserted": len(upserted), "upserted": upserted}, True
+            )
 
     class DB:
         leaks = Coll()
 
-    monkeypatch.setattr("leaks.mongo_utils.mongo_db", DB())
-    monkeypatch.setattr("leaks.mongo_utils.INDEXES_INITIALIZED", True)
+    monkeypatch.setattr("leaks.mongo_utils.get_mongo_db", DB)
 
     # Register dummy scraper
     monkeypatch.setitem(service.registry, "dummy", DummyScraper())
@@ -188,3 +209,388 @@ def test_run_scraper_produces_alert(monkeypatch):
     assert inserted != []
     assert Alert.objects.filter(user=user, resource=resource).count() == 1
     assert captured.get("called") is True
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def new_page(self):
+        if self.browser.crash:
+            self.browser.connected = False
+            raise RuntimeError("browser crashed")
+        return "page"
+
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.crash = False
+        self.proxies = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        self.proxies.append(kwargs.get("proxy"))
+        return FakeContext(self)
+
+    async def close(self):
+        self.connected = False
+
+
+def test_browser_pool_reuses_and_recycles_browsers():
+    launched = []
+
+    async def launcher():
+        browser = FakeBrowser()
+        launched.append(browser)
+        return browser
+
+    pool = BrowserPool(size=1, max_pages=2, launcher=launcher)
+
+    async def lease(proxy=None):
+        async with pool.page(proxy=proxy) as page:
+            return page
+
+    try:
+        assert pool.run(lease("socks5://tor:9050")) == "page"
+        assert pool.run(lease()) == "page"
+        assert len(launched) == 1
+        assert launched[0].proxies == [{"server": "socks5://tor:9050"}, None]
+        assert launched[0].connected is False
+
+        pool.run(lease())
+        assert len(launched) == 2
+        launched[1].crash = True
+        with pytest.raises(RuntimeError):
+            pool.run(lease())
+        pool.run(lease())
+        assert len(launched) == 3
+    finally:
+        pool.close()
+
+
+def test_browser_pool_iterates_async_generator():
+    closed = []
+
+    async def crawl():
+        try:
+            for i in range(3):
+                yield i
+        finally:
+            closed.append(True)
+
+    pool = BrowserPool(size=1, max_pages=1)
+    try:
+        assert list(pool.iterate(crawl())) == [0, 1, 2]
+        items = pool.iterate(crawl())
+        assert next(items) == 0
+        items.close()
+        assert closed == [True, True]
+    finally:
+        pool.close()
+
+
+@pytest.mark.django_db
+def test_run_scraper_fetches_links_concurrently(monkeypatch, settings):
+    settings.SCRAPER_SITE_CONCURRENCY = 3
+    barrier = threading.Barrier(3, timeout=5)
+
+    class ParallelScraper:
+        last_retries = 0
+
+        def run(self, config):
+            barrier.wait()
+            if config.url.endswith("/c"):
+                raise RuntimeError("boom")
+            return []
+
+    monkeypatch.setitem(service.registry, "parallel", ParallelScraper())
+    site = Site.objects.create(
+        name="P", url="http://p.com", scraper="parallel"
+    )
+    for suffix in ("a", "b", "c"):
+        SiteLink.objects.create(site=site, url=f"http://p.com/{suffix}")
+
+    assert service.run_scraper_for_site(site.id) == 0
+    assert ScrapeLog.objects.filter(site=site, success=True).count() == 2
+    failed = ScrapeLog.objects.get(site=site, success=False)
+    assert failed.url == "http://p.com/c"
+    assert failed.message == "boom"
+    assert SiteMetrics.objects.filter(site=site).count() == 3
+
+
+def _http_config(url="http://h.com", max_retries=0, **kwargs):
+    return ScraperConfig(
+        site_id=1,
+        type="website",
+        url=url,
+        bypass_config=BypassConfig(),
+        credentials=None,
+        tor=TorOptions(max_retries=max_retries, retry_interval=0),
+        execution_options=ExecutionOptions(max_retries=0, timeout_seconds=5),
+        **kwargs,
+    )
+
+
+class HtmlScraper(BaseScraper):
+    def parse(self, html):
+        return []
+
+
+class FakeResponse:
+    def __init__(self, text="", status_code=200, headers=None):
+        self.text = text
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+def test_session_pool_evicts_idle_and_lru_sessions(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("scrapers.session_pool.time.monotonic",
+                        lambda: clock[0])
+    pool = SessionPool(max_size=2, idle_timeout=10)
+    first = pool.get((1, None, "fixed"), requests.Session)
+    assert pool.get((1, None, "fixed"), requests.Session) is first
+    pool.get((2, None, "fixed"), requests.Session)
+    pool.get((3, None, "fixed"), requests.Session)
+    assert len(pool) == 2
+    assert pool.get((1, None, "fixed"), requests.Session) is not first
+
+    clock[0] = 11
+    pool.get((4, None, "fixed"), requests.Session)
+    assert len(pool) == 1
+
+
+def test_fetch_reuses_pooled_session(monkeypatch):
+    get_session_pool().clear()
+    sessions = []
+
+    def fake_get(self, url, **kwargs):
+        sessions.append(self)
+        return FakeResponse("<html></html>")
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    scraper = HtmlScraper()
+    scraper.fetch(_http_config())
+    scraper.fetch(_http_config())
+    assert len(sessions) == 2
+    assert sessions[0] is sessions[1]
+    get_session_pool().clear()
+
+
+def test_fetch_sends_validators_and_handles_304(monkeypatch):
+    sent = {}
+
+    def fake_get(self, url, headers=None, **kwargs):
+        sent.update(headers)
+        return FakeResponse(status_code=304)
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    validators = PageValidators(etag='"v1"', last_modified="yesterday")
+    with pytest.raises(NotModified):
+        HtmlScraper().fetch(_http_config(validators=validators))
+    assert sent["If-None-Match"] == '"v1"'
+    assert sent["If-Modified-Since"] == "yesterday"
+
+
+@pytest.mark.django_db
+def test_unchanged_page_skips_parse_and_insert(monkeypatch):
+    parsed = []
+
+    class CountingScraper(HtmlScraper):
+        def parse(self, html):
+            parsed.append(html)
+            return []
+
+    monkeypatch.setattr(
+        requests.Session,
+        "get",
+        lambda self, url, **kw: FakeResponse(
+            "<html>same</html>", headers={"ETag": '"abc"'}
+        ),
+    )
+    monkeypatch.setitem(service.registry, "counting", CountingScraper())
+    site = Site.objects.create(
+        name="C", url="http://c.com", scraper="counting"
+    )
+
+    service.run_scraper_for_site(site.id)
+    fp = PageFingerprint.objects.get(site=site, url="http://c.com")
+    assert fp.etag == '"abc"'
+
+    service.run_scraper_for_site(site.id)
+    assert len(parsed) == 1
+    log = ScrapeLog.objects.filter(site=site).latest("id")
+    assert log.success is True
+    assert log.message == "not modified"
+
+    service.run_scraper_for_site(site.id, {"force": True})
+    assert len(parsed) == 2
+
+
+def test_fetch_retries_on_fresh_circuit(monkeypatch):
+    proxies = []
+
+    def fake_get(self, url, **kwargs):
+        proxies.append(self.proxies["http"])
+        if len(proxies) == 1:
+            raise requests.ConnectionError("circuit failed")
+        return FakeResponse("<html></html>")
+
+    monkeypatch.setattr(requests.Session, "get", fake_get)
+    config = _http_config(max_retries=1)
+    config.bypass_config = BypassConfig(use_proxies=True)
+    scraper = HtmlScraper()
+    scraper.fetch(config)
+    assert scraper.last_retries == 1
+    assert proxies[0] != proxies[1]
+    assert all(p.startswith("socks5h://site-1:") for p in proxies)
+
+
+@pytest.mark.django_db
+def test_failed_fetch_is_rescheduled_without_sleeping(monkeypatch, settings):
+    settings.SCRAPER_DEFER_RETRIES = True
+    settings.TOR_MAX_RETRIES = 2
+
+    def fail_get(self, url, **kwargs):
+        raise requests.ConnectionError("down")
+
+    def no_sleep(seconds):
+        raise AssertionError("worker must not sleep")
+
+    def headless(self, config):
+        raise RuntimeError("headless failed")
+
+    sent = []
+    monkeypatch.setattr(requests.Session, "get", fail_get)
+    monkeypatch.setattr("scrapers.base.time.sleep", no_sleep)
+    monkeypatch.setattr(HtmlScraper, "_fetch_headless_sync", headless)
+    monkeypatch.setattr(
+        "scrapers.service.current_app.send_task",
+        lambda name, args, countdown: sent.append((args[0], countdown)),
+    )
+    monkeypatch.setitem(service.registry, "flaky", HtmlScraper())
+    site = Site.objects.create(name="F", url="http://f.com", scraper="flaky")
+
+    service.run_scraper_for_site(site.id, {"siteId": site.id})
+    payload, countdown = sent[0]
+    assert payload["urls"] == ["http://f.com"]
+    assert payload["attempt"] == 1
+    assert countdown > 0
+    log = ScrapeLog.objects.get(site=site)
+    assert log.message.startswith("retry scheduled")
+
+    service.run_scraper_for_site(site.id, dict(payload, attempt=2))
+    assert len(sent) == 1
+    failed = ScrapeLog.objects.filter(site=site).latest("id")
+    assert failed.message == "headless failed"
+    assert SiteMetrics.objects.get(site=site, permanent_fail=True)
+
+
+@pytest.mark.parametrize("slug", ["ransomhouse", "akira_cli", "playnews"])
+def test_fast_parser_matches_html_parser(slug, monkeypatch):
+    scraper = service.registry[slug]
+    html = (FIXTURES / f"{slug}.html").read_text()
+    fast = scraper.parse(html)
+    monkeypatch.setattr(scraper, "PARSER", "html.parser")
+    monkeypatch.setattr(scraper, "PARSE_ONLY", None)
+    reference = scraper.parse(html)
+    if slug == "akira_cli":  # found_at is the parse time
+        for leak in fast + reference:
+            leak.pop("found_at")
+    assert len(fast) == 8
+    assert fast == reference
+
+
+class StreamingScraper:
+    last_retries = 0
+
+    def __init__(self, error):
+        self.error = error
+
+    def iter_run(self, config):
+        for i in range(5):
+            yield LeakDoc(
+                site_id=config.site_id,
+                company=f"C{i}",
+                source_url=f"http://s.com/{i}",
+            )
+        raise self.error
+
+
+@pytest.fixture
+def inserted_batches(monkeypatch, settings):
+    settings.LEAK_INSERT_BATCH_SIZE = 2
+    batches = []
+
+    def fake_insert(docs):
+        batches.append([doc.company for doc in docs])
+        return BulkInsertResult(inserted=len(docs), duplicates=0)
+
+    monkeypatch.setattr("scrapers.service.insert_leaks", fake_insert)
+    return batches
+
+
+@pytest.mark.django_db
+def test_streamed_leaks_are_inserted_in_batches(monkeypatch, inserted_batches):
+    scraper = StreamingScraper(RuntimeError("crawl interrupted"))
+    monkeypatch.setitem(service.registry, "stream", scraper)
+    site = Site.objects.create(name="S", url="http://s.com", scraper="stream")
+
+    # The leak parsed after the last full batch is inserted, not dropped.
+    assert service.run_scraper_for_site(site.id) == 5
+    assert inserted_batches == [["C0", "C1"], ["C2", "C3"], ["C4"]]
+    log = ScrapeLog.objects.get(site=site)
+    assert log.success is False
+    assert log.message == "crawl interrupted"
+
+
+@pytest.mark.django_db
+def test_partial_batch_is_inserted_before_retry(inserted_batches):
+    site = Site.objects.create(name="S", url="http://s.com")
+    error = RetryLater("timeout")
+
+    result = service._scrape_url(StreamingScraper(error), site, site.url, None)
+    assert (result.inserted, result.retry, result.error) == (5, True, error)
+    assert inserted_batches[-1] == ["C4"]
+
+
+def test_benchmark_reports_registered_scrapers(tmp_path):
+    page = (FIXTURES / "ransomhouse.html").read_text()
+    (tmp_path / "ransomhouse").mkdir()
+    (tmp_path / "ransomhouse" / "page2.html").write_text(page)
+    (tmp_path / "ransomhouse.html").write_text(page)
+
+    results, skipped = run_benchmarks(
+        ["ransomhouse", "telegram"], repeat=3, fixtures_dir=tmp_path
+    )
+    assert skipped == ["telegram"]
+    [result] = results
+    assert (result.pages, result.calls, result.items) == (2, 6, 48)
+    assert result.items_per_sec > 0
+    assert result.peak_memory_kb > 0
+    assert 0 < result.p50_ms <= result.p95_ms <= result.p99_ms
+    assert percentile([4, 1, 3, 2], 50) == 2
+
+
+def test_benchmark_command_flags_regressions(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps([{"slug": "playnews", "items_per_sec": 1}]))
+    call_command("benchmark_scrapers", "playnews", repeat=1, baseline=baseline)
+    assert "playnews" in capsys.readouterr().out
+
+    baseline.write_text(
+        json.dumps([{"slug": "playnews", "items_per_sec": 10**12}])
+    )
+    with pytest.raises(CommandError, match="playnews"):
+        call_command(
+            "benchmark_scrapers", "playnews", repeat=1, baseline=baseline
+        )
@@ -0,0 +1,92 @@
+"""Per-process cache of ``Site`` rows used on ingestion hot paths."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+
+from .models import Site
+
+
+class SiteCache:
+    """TTL cache of sites with their Telegram account preloaded.
+
+    Sites almost never change while scrapers run, so ingestion reads them
+    from here instead of issuing a query per leak. Saves and deletes in
+    this process invalidate entries through signals; other processes
+    pick changes up once ``ttl`` expires. Cached instances are shared
+    between threads and must be treated as read-only.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._sites: Dict[int, Tuple[Site, float]] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, site_ids: Iterable[int]) -> Dict[int, Site]:
+        """Return the existing sites among ``site_ids`` keyed by id."""
+        now = time.monotonic()
+        found: Dict[int, Site] = {}
+        missing = set()
+        with self._lock:
+            for site_id in set(site_ids):
+                entry = self._sites.get(site_id)
+                if entry and now - entry[1] < self.ttl:
+                    found[site_id] = entry[0]
+                else:
+                    missing.add(site_id)
+        if missing:
+            loaded = Site.objects.select_related("telegram_account").in_bulk(
+                missing
+            )
+            with self._lock:
+                for site_id, site in loaded.items():
+                    self._sites[site_id] = (site, now)
+            found.update(loaded)
+        return found
+
+    def get(self, site_id: int) -> Site:
+        site = self.get_many([site_id]).get(site_id)
+        if site is None:
+            raise Site.DoesNotExist(f"Site {site_id} não encontrado")
+        return site
+
+    def invalidate(self, site_id: Optional[int] = None) -> None:
+        """Drop ``site_id``, or every entry when no id is given."""
+        with self._lock:
+            if site_id is None:
+                self._sites.clear()
+            else:
+                self._sites.pop(site_id, None)
+
+
+_cache: Optional[SiteCache] = None
+_cache_pid: Optional[int] = None
+_cache_lock = threading.Lock()
+
+
+def get_site_cache() -> SiteCache:
+    """Return the site cache of the current process."""
+    global _cache, _cache_pid
+    with _cache_lock:
+        if _cache is None or _cache_pid != os.getpid():
+            _cache = SiteCache(ttl=settings.SITE_CACHE_TTL)
+            _cache_pid = os.getpid()
+        return _cache
+
+
+def get_site(site_id: int) -> Site:
+    """Return a cached site, raising ``Site.DoesNotExist`` if missing."""
+    return get_site_cache().get(site_id)
+
+
+def get_sites(site_ids: Iterable[int]) -> Dict[int, Site]:
+    return get_site_cache().get_many(site_ids)
+
+
+def invalidate_site(site_id: Optional[int] = None) -> None:
+    get_site_cache().invalidate(site_id)
@@ -0,0 +1,25 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import invalidate_site
+from .models import Site, TelegramAccount
+
+
+def _invalidate(site_id=None):
+    invalidate_site(site_id)
+    # Drop it again once committed, in case another thread re-cached the
+    # old row while the transaction was open.
+    transaction.on_commit(lambda: invalidate_site(site_id))
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def site_changed(sender, instance, **kwargs):
+    _invalidate(instance.pk)
+
+
+@receiver(post_save, sender=TelegramAccount)
+@receiver(post_delete, sender=TelegramAccount)
+def telegram_account_changed(sender, instance, **kwargs):
+    # Cached sites embed their account, so drop them all.
+    _invalidate()
@@ -1,5 +1,6 @@
 import pytest
 from django.urls import reverse
+from .cache import SiteCache, get_site, get_sites
 from .models import Site, SiteLink, TelegramAccount
 from .serializers import SiteSerializer
 
@@ -173,3 +174,37 @@ def test_site_update_change_link_url(auth_client):
     assert site.links.count() == 1
     assert site.links.first().id == link.id
     assert site.links.first().url == "http://new.com"
+
+
+@pytest.mark.django_db
+def test_site_cache_serves_repeat_reads(django_assert_num_queries):
+    account = TelegramAccount.objects.create(api_id=1, api_hash="h")
+    site = Site.objects.create(
+        name="S", url="http://s.com", telegram_account=account
+    )
+    other = Site.objects.create(name="O", url="http://o.com")
+
+    with django_assert_num_queries(2):
+        assert get_site(site.id).telegram_account == account
+        assert get_site(site.id).name == "S"
+        assert set(get_sites([site.id, other.id])) == {site.id, other.id}
+    with django_assert_num_queries(0):
+        get_sites([site.id, other.id])
+        get_site(other.id)
+
+    site.name = "Renamed"
+    site.save()
+    assert get_site(site.id).name == "Renamed"
+    site_id = site.id
+    site.delete()
+    with pytest.raises(Site.DoesNotExist):
+        get_site(site_id)
+
+
+@pytest.mark.django_db
+def test_site_cache_expires_after_ttl(django_assert_num_queries):
+    site = Site.objects.create(name="S", url="http://s.com")
+    cache = SiteCache(ttl=0)
+    with django_assert_num_queries(2):
+        cache.get(site.id)
+        cache.get(site.id)
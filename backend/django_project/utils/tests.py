@@ -1,5 +1,6 @@
 from django.http import HttpRequest
 from .get_ip import get_client_ip
+from .tor import TorCircuitPool
 
 
 def test_get_client_ip_from_forwarded_header():
@@ -12,3 +13,26 @@ def test_get_client_ip_from_remote_addr():
     request = HttpRequest()
     request.META['REMOTE_ADDR'] = '3.3.3.3'
     assert get_client_ip(request) == '3.3.3.3'
+
+
+def test_circuit_pool_isolates_keys_with_socks_credentials():
+    pool = TorCircuitPool("socks5h://tor:9050")
+    first = pool.proxy_for("site-1")
+    assert first.startswith("socks5h://site-1:")
+    assert first.endswith("@tor:9050")
+    other = pool.proxy_for("site-2")
+    assert pool.proxy_for("site-1") == first
+
+    pool.renew("site-1")
+    assert pool.proxy_for("site-1") != first
+    assert pool.proxy_for("site-2") == other
+
+
+def test_circuit_pool_without_isolation_uses_newnym(monkeypatch):
+    calls = []
+    monkeypatch.setattr("utils.tor.renew_tor_circuit",
+                        lambda: calls.append(1))
+    pool = TorCircuitPool("socks5h://tor:9050", isolate=False)
+    assert pool.proxy_for("site-1") == "socks5h://tor:9050"
+    pool.renew("site-1")
+    assert calls == [1]
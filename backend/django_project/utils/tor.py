@@ -2,7 +2,11 @@ from stem import Signal
 from stem.control import Controller
 from django.conf import settings
 from ipaddress import ip_address
+from typing import Dict, Optional
+from urllib.parse import quote, urlsplit, urlunsplit
+import secrets
 import socket
+import threading
 
 
 def renew_tor_circuit() -> None:
@@ -21,3 +25,62 @@ def renew_tor_circuit() -> None:
         else:
             ctrl.authenticate()
         ctrl.signal(Signal.NEWNYM)
+
+
+def _with_credentials(proxy: str, username: str, password: str) -> str:
+    parts = urlsplit(proxy)
+    host = parts.hostname or ""
+    if parts.port:
+        host = f"{host}:{parts.port}"
+    netloc = f"{quote(username, safe='')}:{quote(password, safe='')}@{host}"
+    return urlunsplit(parts._replace(netloc=netloc))
+
+
+class TorCircuitPool:
+    """Give each key its own Tor circuit via SOCKS credentials.
+
+    With ``IsolateSOCKSAuth`` (Tor's default) streams using different
+    SOCKS username/password pairs never share a circuit. Each key gets a
+    random password, and :meth:`renew` replaces it so only that key moves
+    to a fresh circuit while in-flight requests of other keys are left
+    alone. When isolation is disabled every key shares ``proxy`` and
+    :meth:`renew` falls back to a global NEWNYM.
+    """
+
+    def __init__(self, proxy: str, isolate: bool = True) -> None:
+        self.proxy = proxy
+        self.isolate = isolate
+        self._tokens: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def proxy_for(self, key: str) -> str:
+        if not self.isolate:
+            return self.proxy
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None:
+                token = self._tokens[key] = secrets.token_hex(8)
+        return _with_credentials(self.proxy, key, token)
+
+    def renew(self, key: str) -> None:
+        if not self.isolate:
+            renew_tor_circuit()
+            return
+        with self._lock:
+            self._tokens[key] = secrets.token_hex(8)
+
+
+_circuit_pools: Dict[str, TorCircuitPool] = {}
+_circuit_pools_lock = threading.Lock()
+
+
+def get_circuit_pool(proxy: Optional[str] = None) -> TorCircuitPool:
+    """Return the process-wide pool for ``proxy`` (``TOR_PROXY``)."""
+    proxy = (proxy or settings.TOR_PROXY).replace("socks5://", "socks5h://")
+    with _circuit_pools_lock:
+        pool = _circuit_pools.get(proxy)
+        if pool is None:
+            pool = _circuit_pools[proxy] = TorCircuitPool(
+                proxy, isolate=settings.TOR_STREAM_ISOLATION
+            )
+        return pool